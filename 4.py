@@ -8,8 +8,22 @@
 3. Оба метода сохраняют регистр букв и не изменяют символы не из алфавита
 """
 
+import argparse
+import glob
 import os
 import random
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import lru_cache
+from time import perf_counter
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy Виженер работает посимвольно
+    np = None
+
+from cipher_codec import get_alphabet, translation_table
 
 
 def read_file(filename):
@@ -33,41 +47,90 @@ def get_first_lines(text, n=5):
     return "\n".join(lines[:n])
 
 
+# Размер блока (в символах) при потоковой обработке файла
+CHUNK_SIZE = 1 << 20
+
+# Файлы больше этого размера (в байтах) обрабатываются потоково, по блокам
+STREAM_THRESHOLD = 16 << 20
+
+
+def stream_cipher_file(src, en_filename, de_filename, encrypt_chunk, decrypt_chunk,
+                       chunk_size=CHUNK_SIZE):
+    """
+    Потоковое шифрование и дешифрование файла блоками фиксированного размера
+
+    Файл не загружается в память целиком: каждый блок шифруется, сразу
+    дописывается в en_filename, расшифровывается и дописывается в de_filename.
+    encrypt_chunk и decrypt_chunk вызываются как f(chunk, offset), где
+    offset - позиция блока в полном тексте (нужна Виженеру для выбора
+    символа ключа на стыке блоков).
+
+    Возвращает (число символов, (исходный, зашифрованный, расшифрованный)
+    предпросмотр первого блока)
+    """
+    offset = 0
+    preview = None
+    with open(src, "r", encoding="utf-8") as fin, \
+            open(en_filename, "w", encoding="utf-8") as fen, \
+            open(de_filename, "w", encoding="utf-8") as fde:
+        while True:
+            # read(n) в текстовом режиме читает n символов, поэтому
+            # многобайтовые символы UTF-8 не разрываются на границе блока
+            chunk = fin.read(chunk_size)
+            if not chunk:
+                break
+            encrypted = encrypt_chunk(chunk, offset)
+            decrypted = decrypt_chunk(encrypted, offset)
+            fen.write(encrypted)
+            fde.write(decrypted)
+            if preview is None:
+                preview = tuple(get_first_lines(part) for part in (chunk, encrypted, decrypted))
+            offset += len(chunk)
+    return offset, preview
+
+
+def is_large_file(filename):
+    """Проверка, нужно ли обрабатывать файл потоково (по размеру в байтах)"""
+    return os.path.exists(filename) and os.path.getsize(filename) > STREAM_THRESHOLD
+
+
+def print_preview(original, encrypted, decrypted, cipher_name):
+    """Вывод первых строк исходного, зашифрованного и расшифрованного текста"""
+    print("\nИсходный текст (первые 5 строк):")
+    print(original)
+    print(f"\nЗашифрованный текст ({cipher_name}):")
+    print(encrypted)
+    print(f"\nРасшифрованный текст ({cipher_name}):")
+    print(decrypted)
+
+
+
 
 
 
+# Алфавиты для латиницы и кириллицы (с учетом буквы Ё);
+# строчные буквы кодек получает из заглавных
+LAT_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+RUS_UPPER = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
+
+# Период сдвига для обоих алфавитов: НОК(26, 33) = 858.
+# Ключи, равные по этому модулю, дают одинаковую таблицу замены
+CAESAR_KEY_PERIOD = 858
+
+
+@lru_cache(maxsize=64)
+def _caesar_table(key):
+    """Построение таблицы замены для str.translate (один раз на каждый ключ)"""
+    # Каждая буква латиницы и кириллицы сдвигается на key по модулю длины
+    # своего алфавита с сохранением регистра (см. cipher_codec)
+    return translation_table((get_alphabet(LAT_UPPER), get_alphabet(RUS_UPPER)), key)
+
 
 def caesar_encrypt(text, key):
     """Шифрование текста методом Цезаря с заданным ключом-сдвигом"""
-    result = []
-    # Определение алфавитов для латиницы и кириллицы (с учетом буквы Ё)
-    LAT_UPPER = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
-    LAT_LOWER = "abcdefghijklmnopqrstuvwxyz"
-    RUS_UPPER = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
-    RUS_LOWER = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя"
-
-    for ch in text:
-        # Алгоритм шифрования для каждого символа:
-        # 1. Находим позицию символа в соответствующем алфавите
-        # 2. Добавляем к позиции ключ (сдвиг)
-        # 3. Берем результат по модулю длины алфавита (для зацикливания)
-        # 4. Заменяем символ на новый из алфавита
-
-        if ch in LAT_UPPER:  # Английские заглавные буквы
-            new_index = (LAT_UPPER.index(ch) + key) % len(LAT_UPPER)
-            result.append(LAT_UPPER[new_index])
-        elif ch in LAT_LOWER:  # Английские строчные буквы
-            new_index = (LAT_LOWER.index(ch) + key) % len(LAT_LOWER)
-            result.append(LAT_LOWER[new_index])
-        elif ch in RUS_UPPER:  # Русские заглавные буквы (включая Ё)
-            new_index = (RUS_UPPER.index(ch) + key) % len(RUS_UPPER)
-            result.append(RUS_UPPER[new_index])
-        elif ch in RUS_LOWER:  # Русские строчные буквы (включая Ё)
-            new_index = (RUS_LOWER.index(ch) + key) % len(RUS_LOWER)
-            result.append(RUS_LOWER[new_index])
-        else:
-            result.append(ch)  # Неалфавитные символы остаются без изменений
-    return "".join(result)
+    # Вся работа с символами выполняется в str.translate по готовой таблице;
+    # неалфавитные символы в таблицу не входят и остаются без изменений
+    return text.translate(_caesar_table(key % CAESAR_KEY_PERIOD))
 
 
 def caesar_decrypt(text, key):
@@ -92,79 +155,118 @@ def caesar_decrypt(text, key):
 CYRILLIC_ALPHABET = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
 
 
+class VigenereTable:
+    """
+    Квадрат Виженера для заданного алфавита
+
+    Квадрат N x N хранится компактно - индексами букв в bytes (один байт на
+    клетку): строка row - сдвиг алфавита на row позиций. Таблица строится
+    один раз на алфавит (см. get_vigenere_table), после чего шифрование
+    и дешифрование каждого символа - это поиск по словарю кодека алфавита
+    и по индексу в таблице, без поиска буквы в строке алфавита
+    """
+
+    def __init__(self, alphabet):
+        self.codec = get_alphabet(alphabet)
+        self.size = size = self.codec.size
+
+        # Клетка [row, col] квадрата - индекс буквы (row + col) % N,
+        # в обратной таблице - (col - row) % N для дешифрования
+        self.square = bytes((row + col) % size for row in range(size) for col in range(size))
+        self.inverse = bytes((col - row) % size for row in range(size) for col in range(size))
+
+    def rows(self):
+        """Строки квадрата по одной (без сборки всего квадрата в строку)"""
+        upper = self.codec.upper
+        for row in range(self.size):
+            start = row * self.size
+            yield "".join(upper[index] for index in self.square[start:start + self.size])
+
+    def key_rows(self, key):
+        """Смещения строк квадрата для символов ключа"""
+        return [shift * self.size for shift in self.codec.key_shifts(key)]
+
+    def translate(self, text, key, decrypt=False, offset=0):
+        """
+        Посимвольное шифрование (decrypt=True - дешифрование) по таблице
+
+        Символ ключа для i-го символа текста - key[(offset + i) % len(key)];
+        регистр букв и неалфавитные символы сохраняются
+        """
+        table = self.inverse if decrypt else self.square
+        rows = self.key_rows(key)
+        key_length = len(rows)
+        positions = self.codec.positions
+        upper, lower = self.codec.upper, self.codec.lower
+        result = []
+        for i, ch in enumerate(text):
+            position = positions.get(ch)
+            if position is None:
+                result.append(ch)  # Неалфавитные символы остаются без изменений
+                continue
+            col, is_lower = position
+            letters = lower if is_lower else upper
+            result.append(letters[table[rows[(offset + i) % key_length] + col]])
+        return "".join(result)
+
+
+@lru_cache(maxsize=32)
+def get_vigenere_table(alphabet):
+    """Квадрат Виженера для алфавита (кэшируется: строится один раз на алфавит)"""
+    return VigenereTable(alphabet)
+
+
 def vigenere_square(alphabet):
     """Генерация квадрата Виженера для заданного алфавита"""
-    size = len(alphabet)
-    rows = []
     # Квадрат Виженера - это таблица, где каждая строка представляет
     # алфавит, сдвинутый на одну позицию относительно предыдущей
-    for i in range(size):
-        # Создаем строку: алфавит, начиная с i-й позиции + остаток
-        row = alphabet[i:] + alphabet[:i]
-        rows.append(row)
-    return "\n".join(rows)
-
-
-def vigenere_encrypt(text, key, alphabet):
-    """Шифрование текста методом Виженера"""
-    result = []
-    key_length = len(key)
-    alphabet_upper = alphabet.upper()  # Алфавит в верхнем регистре
-    alphabet_lower = alphabet.lower()  # Алфавит в нижнем регистре
-
-    for i, ch in enumerate(text):
-        # Алгоритм шифрования для каждого символа:
-        # 1. Находим соответствующий символ ключа (ключ повторяется циклически)
-        # 2. Определяем индексы символа текста и символа ключа в алфавите
-        # 3. Складываем индексы по модулю длины алфавита
-        # 4. Заменяем символ на новый из алфавита
-
-        if ch.upper() in alphabet_upper:
-            # Обработка с учетом регистра
-            if ch.isupper():  # Для заглавных букв
-                text_index = alphabet_upper.index(ch)
-                key_char = key[i % key_length].upper()
-                key_index = alphabet_upper.index(key_char)
-                enc_index = (text_index + key_index) % len(alphabet_upper)
-                result.append(alphabet_upper[enc_index])
-            else:  # Для строчных букв
-                text_index = alphabet_lower.index(ch)
-                key_char = key[i % key_length].lower()
-                key_index = alphabet_lower.index(key_char)
-                enc_index = (text_index + key_index) % len(alphabet_lower)
-                result.append(alphabet_lower[enc_index])
-        else:
-            result.append(ch)  # Неалфавитные символы остаются без изменений
-    return "".join(result)
-
-
-def vigenere_decrypt(text, key, alphabet):
-    """Дешифрование текста методом Виженера"""
-    result = []
-    key_length = len(key)
-    alphabet_upper = alphabet.upper()
-    alphabet_lower = alphabet.lower()
-
-    for i, ch in enumerate(text):
-        # Алгоритм дешифрования аналогичен шифрованию, но вместо сложения
-        # индексов выполняется вычитание индекса ключевого символа
-
-        if ch.upper() in alphabet_upper:
-            if ch.isupper():  # Для заглавных букв
-                text_index = alphabet_upper.index(ch)
-                key_char = key[i % key_length].upper()
-                key_index = alphabet_upper.index(key_char)
-                dec_index = (text_index - key_index) % len(alphabet_upper)
-                result.append(alphabet_upper[dec_index])
-            else:  # Для строчных букв
-                text_index = alphabet_lower.index(ch)
-                key_char = key[i % key_length].lower()
-                key_index = alphabet_lower.index(key_char)
-                dec_index = (text_index - key_index) % len(alphabet_lower)
-                result.append(alphabet_lower[dec_index])
-        else:
-            result.append(ch)  # Неалфавитные символы остаются без изменений
-    return "".join(result)
+    return "\n".join(get_vigenere_table(alphabet).rows())
+
+
+# Тексты короче этого порога шифруются посимвольно: на коротких строках
+# накладные расходы NumPy больше, чем выигрыш от векторизации
+NUMPY_MIN_LENGTH = 4096
+
+
+def _vigenere_numpy(text, key, alphabet, sign, offset=0):
+    """
+    Векторизованный шифр Виженера на NumPy: sign=1 - шифрование, sign=-1 - дешифрование
+
+    Кодек алфавита переводит текст в массив индексов букв, к индексам одним
+    действием прибавляются (вычитаются) сдвиги повторенного ключа по модулю
+    длины алфавита, после чего индексы переводятся обратно в буквы того же регистра.
+    Сдвиг для каждой буквы - индекс символа ключа, выбранного по позиции
+    в полном тексте (как key[(offset + i) % len(key)] в посимвольной версии)
+    """
+    codec = get_alphabet(alphabet)
+    return codec.shift(text, codec.key_shifts(key), sign, offset)
+
+
+def vigenere_encrypt(text, key, alphabet, offset=0):
+    """Шифрование текста методом Виженера
+
+    offset - позиция text в полном тексте (для обработки текста по частям):
+    символ ключа для i-го символа берется как key[(offset + i) % len(key)]
+    """
+    if np is not None and len(text) >= NUMPY_MIN_LENGTH:
+        return _vigenere_numpy(text, key, alphabet, 1, offset)
+
+    # Алгоритм шифрования для каждого символа:
+    # 1. Находим соответствующий символ ключа (ключ повторяется циклически)
+    # 2. Строка квадрата Виженера выбирается символом ключа,
+    #    столбец - символом текста
+    # 3. В клетке таблицы - индекс зашифрованной буквы того же регистра
+    return get_vigenere_table(alphabet).translate(text, key, offset=offset)
+
+
+def vigenere_decrypt(text, key, alphabet, offset=0):
+    """Дешифрование текста методом Виженера (offset - как в vigenere_encrypt)"""
+    if np is not None and len(text) >= NUMPY_MIN_LENGTH:
+        return _vigenere_numpy(text, key, alphabet, -1, offset)
+
+    # Дешифрование аналогично шифрованию, но по обратной таблице:
+    # в ней индекс ключевого символа вычитается, а не прибавляется
+    return get_vigenere_table(alphabet).translate(text, key, decrypt=True, offset=offset)
 
 
 
@@ -177,6 +279,16 @@ def caesar_cli():
         print("Ошибка: Ключ должен быть целым числом!")
         return
 
+    # Большие файлы шифруются потоково, без загрузки в память целиком
+    if is_large_file("caesar_test.txt"):
+        _, preview = stream_cipher_file(
+            "caesar_test.txt", "en_Cesar.txt", "de_Cesar.txt",
+            lambda chunk, offset: caesar_encrypt(chunk, key),
+            lambda chunk, offset: caesar_decrypt(chunk, key),
+        )
+        print_preview(*preview, "Цезарь")
+        return
+
     original = read_file("caesar_test.txt")
     if original is None or len(original) < 2000:
         print("Ошибка: Файл caesar_test.txt не найден или содержит менее 2000 символов!")
@@ -191,12 +303,8 @@ def caesar_cli():
     write_file("de_Cesar.txt", decrypted)
 
     # Вывод результатов
-    print("\nИсходный текст (первые 5 строк):")
-    print(get_first_lines(original))
-    print("\nЗашифрованный текст (Цезарь):")
-    print(get_first_lines(encrypted))
-    print("\nРасшифрованный текст (Цезарь):")
-    print(get_first_lines(decrypted))
+    print_preview(get_first_lines(original), get_first_lines(encrypted),
+                  get_first_lines(decrypted), "Цезарь")
 
 
 def vigenere_cli():
@@ -226,7 +334,17 @@ def vigenere_cli():
 
     # Вывод квадрата Виженера
     print("\n----- Квадрат Виженера -----")
-    print(vigenere_square(alphabet))
+    for row in get_vigenere_table(alphabet).rows():
+        print(row)
+
+    if is_large_file("Vinzher_test.txt"):
+        _, preview = stream_cipher_file(
+            "Vinzher_test.txt", "en_Vishner.txt", "de_Vishner.txt",
+            lambda chunk, offset: vigenere_encrypt(chunk, key, alphabet, offset),
+            lambda chunk, offset: vigenere_decrypt(chunk, key, alphabet, offset),
+        )
+        print_preview(*preview, "Виженер")
+        return
 
     original = read_file("Vinzher_test.txt")
     if original is None or len(original) < 2000:
@@ -242,12 +360,158 @@ def vigenere_cli():
     write_file("de_Vishner.txt", decrypted)
 
     # Вывод результатов
-    print("\nИсходный текст (первые 5 строк):")
-    print(get_first_lines(original))
-    print("\nЗашифрованный текст (Виженер):")
-    print(get_first_lines(encrypted))
-    print("\nРасшифрованный текст (Виженер):")
-    print(get_first_lines(decrypted))
+    print_preview(get_first_lines(original), get_first_lines(encrypted),
+                  get_first_lines(decrypted), "Виженер")
+
+
+def collect_batch_files(target, decrypt=False):
+    """
+    Список файлов для пакетной обработки: .txt файлы каталога или файлы,
+    подходящие под маску. В каталоге при шифровании берутся исходные
+    тексты (кроме результатов en_*/de_*), при дешифровании - только
+    зашифрованные файлы en_*
+    """
+    if os.path.isdir(target):
+        paths = glob.glob(os.path.join(target, "*.txt"))
+        names = [os.path.basename(p) for p in paths]
+        if decrypt:
+            paths = [p for p, name in zip(paths, names) if name.startswith("en_")]
+        else:
+            paths = [p for p, name in zip(paths, names) if not name.startswith(("en_", "de_"))]
+    else:
+        paths = glob.glob(target)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+def atomic_write_chunks(filename, chunks):
+    """
+    Атомарная запись: текст пишется во временный файл рядом с целевым,
+    который затем заменяет целевой одной операцией os.replace
+    """
+    directory = os.path.dirname(os.path.abspath(filename))
+    fd, tmp_name = tempfile.mkstemp(dir=directory, prefix=".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp создает файл с правами 0600, возвращаем обычные права с учетом umask
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp_name, 0o666 & ~umask)
+        os.replace(tmp_name, filename)
+    except BaseException:
+        os.remove(tmp_name)
+        raise
+
+
+def batch_worker(path, cipher, key, alphabet, decrypt):
+    """
+    Обработка одного файла в процессе пула: результат сохраняется рядом
+    с исходным файлом как en_<имя> (или de_<имя> при дешифровании;
+    у зашифрованного en_<имя> префикс en_ заменяется на de_)
+
+    Возвращает (исходный файл, файл результата, размер в байтах, время, PID воркера)
+    """
+    start = perf_counter()
+    if cipher == "caesar":
+        def transform(chunk, offset):
+            return caesar_decrypt(chunk, key) if decrypt else caesar_encrypt(chunk, key)
+    else:
+        def transform(chunk, offset):
+            if decrypt:
+                return vigenere_decrypt(chunk, key, alphabet, offset)
+            return vigenere_encrypt(chunk, key, alphabet, offset)
+
+    def chunks():
+        offset = 0
+        with open(path, "r", encoding="utf-8") as f:
+            while True:
+                chunk = f.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield transform(chunk, offset)
+                offset += len(chunk)
+
+    directory, name = os.path.split(path)
+    if decrypt and name.startswith("en_"):
+        name = name[len("en_"):]
+    out_path = os.path.join(directory, ("de_" if decrypt else "en_") + name)
+    atomic_write_chunks(out_path, chunks())
+    return path, out_path, os.path.getsize(path), perf_counter() - start, os.getpid()
+
+
+def batch_encrypt(target, cipher, key, alphabet=CYRILLIC_ALPHABET, decrypt=False, workers=None):
+    """
+    Пакетное шифрование (дешифрование) множества файлов в пуле процессов
+
+    target - каталог или маска файлов; cipher - "caesar" или "vigenere".
+    Выводит пропускную способность (МБ/с) каждого воркера и общую.
+    Возвращает список результатов batch_worker для успешно обработанных файлов
+    """
+    paths = collect_batch_files(target, decrypt)
+    if not paths:
+        print(f"Ошибка: Не найдено файлов для обработки: {target}")
+        return []
+
+    results = []
+    start = perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(batch_worker, path, cipher, key, alphabet, decrypt): path
+            for path in paths
+        }
+        for future in as_completed(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                print(f"Ошибка при обработке файла {futures[future]}: {e}")
+    wall_time = perf_counter() - start
+
+    # Пропускная способность по воркерам: суммарный объем / суммарное время
+    per_worker = {}
+    for _, _, size, elapsed, pid in results:
+        total_size, total_time = per_worker.get(pid, (0, 0.0))
+        per_worker[pid] = (total_size + size, total_time + elapsed)
+
+    print(f"\nОбработано файлов: {len(results)} из {len(paths)}")
+    for pid, (total_size, total_time) in sorted(per_worker.items()):
+        speed = total_size / 2 ** 20 / total_time if total_time > 0 else float("inf")
+        print(f"  Воркер {pid}: {total_size / 2 ** 20:.2f} МБ, {speed:.2f} МБ/с")
+    total = sum(size for _, _, size, _, _ in results)
+    if wall_time > 0:
+        print(f"Итого: {total / 2 ** 20:.2f} МБ за {wall_time:.2f} сек "
+              f"({total / 2 ** 20 / wall_time:.2f} МБ/с)")
+    return results
+
+
+def batch_cli(argv):
+    """Неинтерактивный пакетный режим: python 4.py <каталог|маска> --cipher ... --key ..."""
+    parser = argparse.ArgumentParser(
+        prog="4.py", description="Пакетное шифрование файлов методами Цезаря и Виженера"
+    )
+    parser.add_argument("target", help="каталог с .txt файлами или маска файлов")
+    parser.add_argument("--cipher", choices=("caesar", "vigenere"), required=True)
+    parser.add_argument("--key", required=True, help="сдвиг (Цезарь) или ключевое слово (Виженер)")
+    parser.add_argument("--alphabet", default=CYRILLIC_ALPHABET, help="алфавит для Виженера")
+    parser.add_argument("--decrypt", action="store_true", help="дешифровать вместо шифрования")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов")
+    args = parser.parse_args(argv)
+
+    if args.cipher == "caesar":
+        try:
+            key = int(args.key)
+        except ValueError:
+            parser.error("ключ Цезаря должен быть целым числом")
+    else:
+        key = args.key
+        if not key:
+            parser.error("ключ Виженера не может быть пустым")
+        if not all(ch.upper() in args.alphabet.upper() for ch in key):
+            parser.error("ключ должен состоять из букв алфавита")
+
+    batch_encrypt(args.target, args.cipher, key, args.alphabet, args.decrypt, args.workers)
 
 
 def main():
@@ -270,4 +534,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 1:
+        batch_cli(sys.argv[1:])
+    else:
+        main()
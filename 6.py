@@ -3,10 +3,22 @@
 Реализует анализ шифров Цезаря и Виженера с визуализацией результатов
 """
 
+import codecs
+import hashlib
+import io
+import math
+import mmap
 import os
-import matplotlib.pyplot as plt
-from collections import Counter
-from itertools import zip_longest  # Для работы с последовательностями разной длины
+import random
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from multiprocessing import shared_memory
+import numpy as np
+
+from cipher_codec import NON_LETTER, get_alphabet
+from reporting import DEFAULT_FORMATS, REPORT_FORMATS, finish_figure, get_pyplot, is_headless, slugify
 
 # Русский алфавит с буквой Ё (33 буквы) в верхнем регистре
 RUS_ALPHABET = "АБВГДЕЁЖЗИЙКЛМНОПРСТУФХЦЧШЩЪЫЬЭЮЯ"
@@ -66,6 +78,54 @@ COMMON_BIGRAMS = [
     'КО'
 ]
 
+# Английский алфавит и эталонные частоты букв английского языка
+ENG_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+ENG_LETTER_FREQ = {
+    'E': 0.1270, 'T': 0.0906, 'A': 0.0817, 'O': 0.0751, 'I': 0.0697,
+    'N': 0.0675, 'S': 0.0633, 'H': 0.0609, 'R': 0.0599, 'D': 0.0425,
+    'L': 0.0403, 'C': 0.0278, 'U': 0.0276, 'M': 0.0241, 'W': 0.0236,
+    'F': 0.0223, 'G': 0.0202, 'Y': 0.0197, 'P': 0.0193, 'B': 0.0149,
+    'V': 0.0098, 'K': 0.0077, 'J': 0.0015, 'X': 0.0015, 'Q': 0.0010,
+    'Z': 0.0007
+}
+
+# Поддерживаемые языки: код -> (алфавит, эталонные частоты букв)
+LANGUAGES = {
+    "ru": (RUS_ALPHABET, RUS_LETTER_FREQ),
+    "en": (ENG_ALPHABET, ENG_LETTER_FREQ),
+}
+
+# Кодеки алфавитов языков из LANGUAGES (таблицы строятся один раз);
+# не-буквенные символы в индексном массиве текста - метка NON_LETTER
+CODECS = {lang: get_alphabet(alphabet) for lang, (alphabet, _) in LANGUAGES.items()}
+RUS_CODEC = CODECS["ru"]
+
+# Эталонные частоты в виде вектора в порядке RUS_ALPHABET (нормированы на 1)
+RUS_FREQ_VECTOR = np.array([RUS_LETTER_FREQ[letter] for letter in RUS_ALPHABET])
+RUS_FREQ_VECTOR /= RUS_FREQ_VECTOR.sum()
+
+# SHIFT_INDEX[k, j] = (j + k) % 33 - индекс буквы шифротекста, в которую
+# при сдвиге k переходит j-я буква открытого текста
+SHIFT_INDEX = (np.arange(33)[None, :] + np.arange(33)[:, None]) % 33
+
+# Логарифмы эталонных частот (для оценки правдоподобия расшифровки)
+RUS_LOG_FREQ = np.log(RUS_FREQ_VECTOR)
+
+# Индекс совпадений осмысленного русского текста и случайного текста из 33 букв
+RUS_IC = float((RUS_FREQ_VECTOR ** 2).sum())
+RANDOM_IC = 1 / 33
+
+# Размер блока (в символах) при переводе текста в индексный массив:
+# ограничивает объем временных массивов для больших текстов
+INDEX_BLOCK_SIZE = 1 << 20
+
+# Размер окна (в байтах) при чтении файла через mmap
+MMAP_WINDOW_SIZE = 16 << 20
+
+# Файлы больше этого размера анализируются без загрузки текста в память:
+# через индексный массив read_indices и потоковую дешифровку decrypt_file
+LARGE_FILE_SIZE = 64 << 20
+
 
 def read_file(filename):
 
@@ -83,6 +143,11 @@ def read_file(filename):
         return None
 
 
+def is_large_file(filename):
+    """Файл существует и больше LARGE_FILE_SIZE (анализ без загрузки в память)"""
+    return os.path.isfile(filename) and os.path.getsize(filename) > LARGE_FILE_SIZE
+
+
 def write_file(filename, text):
     try:
         with open(filename, "w", encoding="utf-8") as f:
@@ -93,84 +158,226 @@ def write_file(filename, text):
 
 # ==================== ЧАСТОТНЫЙ АНАЛИЗ ====================
 
-def calculate_letter_frequencies(text):
+def text_to_indices(text, lang="ru"):
     """
-    Подсчет частоты встречаемости русских букв в тексте
+    Перевод текста в массив индексов букв (uint8) за один проход
 
+    Каждая буква алфавита языка lang (в любом регистре) заменяется своим
+    индексом в алфавите, все остальные символы - меткой NON_LETTER.
+    Позиции в массиве совпадают с позициями символов в тексте
     """
-    # Приводим текст к верхнему регистру для единообразия
-    text = text.upper()
+    codec = CODECS[lang]
+    result = np.empty(len(text), dtype=np.uint8)
+    for start in range(0, len(text), INDEX_BLOCK_SIZE):
+        block = text[start:start + INDEX_BLOCK_SIZE]
+        result[start:start + len(block)] = codec.encode(block)
+    return result
 
-    # Подсчитываем общее количество русских букв в тексте
-    # Используем генератор для фильтрации только русских букв
-    total_letters = sum(1 for char in text if char in RUS_ALPHABET)
 
-    # Создаем пустой словарь для хранения частот
-    freq = {}
+def as_indices(data):
+    """Индексный массив для текста или готового массива (например, из read_indices)"""
+    if isinstance(data, np.ndarray):
+        return data
+    return text_to_indices(data)
 
-    # Перебираем все буквы русского алфавита
-    for letter in RUS_ALPHABET:
-        # Считаем количество вхождений текущей буквы в текст
-        count = text.count(letter)
 
-        # Вычисляем относительную частоту (доля от общего числа букв)
-        if total_letters > 0:  # Проверка чтобы избежать деления на ноль
-            # Округляем частоту до 4 знаков после запятой
-            freq[letter] = round(count / total_letters, 4)
-        else:
-            # Если в тексте нет русских букв - устанавливаем частоту 0.0
-            freq[letter] = 0.0
+def read_indices(filename, lang="ru", window=MMAP_WINDOW_SIZE):
+    """
+    Индексный массив текста файла без загрузки всего текста в память
+
+    Файл отображается в память (mmap) и декодируется окнами по window байт:
+    инкрементальный декодер корректно обрабатывает многобайтовые символы
+    на границах окон, а переводы строк приводятся к '\n', как при чтении
+    в текстовом режиме. Поэтому результат совпадает с
+    text_to_indices(read_file(filename)), но в памяти одновременно
+    находится только одно окно текста и массив по байту на символ
 
-    # Возвращаем словарь с частотами
+    Возвращает:
+        np.ndarray: индексный массив (uint8)
+    """
+    size = os.path.getsize(filename)
+    # Символов в UTF-8 не больше, чем байт: выделяем с запасом и обрезаем
+    result = np.empty(size, dtype=np.uint8)
+    count = 0
+    if size == 0:
+        return result
+
+    decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder("utf-8")(), translate=True)
+    with open(filename, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        for start in range(0, size, window):
+            end = min(start + window, size)
+            text = decoder.decode(mapped[start:end], final=end == size)
+            result[count:count + len(text)] = text_to_indices(text, lang)
+            count += len(text)
+
+    result.resize(count, refcheck=False)
+    return result
+
+
+def letter_counts(text):
+    """
+    Подсчет количества каждой русской буквы в тексте за один проход
+
+    Возвращает:
+        np.ndarray: вектор из 33 целых чисел в порядке RUS_ALPHABET
+    """
+    # bincount по индексному массиву считает все буквы сразу;
+    # метки NON_LETTER попадают в последний столбец и отбрасываются.
+    # bincount приводит массив к intp (8 байт на символ), поэтому
+    # большой массив считается блоками
+    indices = as_indices(text)
+    counts = np.zeros(NON_LETTER + 1, dtype=np.int64)
+    for start in range(0, len(indices), INDEX_BLOCK_SIZE):
+        counts += np.bincount(indices[start:start + INDEX_BLOCK_SIZE], minlength=NON_LETTER + 1)
+    return counts[:len(RUS_ALPHABET)]
+
+
+def letter_prefix(indices, max_letters):
+    """
+    Начало индексного массива, в котором ровно max_letters букв (или весь массив)
+
+    Буквы ищутся блоками по INDEX_BLOCK_SIZE, поэтому для огромного массива
+    временные массивы не зависят от его длины
+    """
+    if max_letters <= 0:
+        return indices[:0]
+    found = 0
+    for start in range(0, len(indices), INDEX_BLOCK_SIZE):
+        is_letter = indices[start:start + INDEX_BLOCK_SIZE] != NON_LETTER
+        letters = int(np.count_nonzero(is_letter))
+        if found + letters >= max_letters:
+            end = start + int(np.flatnonzero(is_letter)[max_letters - found - 1]) + 1
+            return indices[:end]
+        found += letters
+    return indices
+
+
+def frequencies_from_counts(counts):
+    """Перевод вектора количеств букв в словарь частот, округленных до 4 знаков"""
+    total_letters = int(counts.sum())
+
+    # Если в тексте нет русских букв - все частоты равны 0.0
+    if total_letters == 0:
+        return {letter: 0.0 for letter in RUS_ALPHABET}
+
+    return {
+        letter: round(int(count) / total_letters, 4)
+        for letter, count in zip(RUS_ALPHABET, counts)
+    }
+
+
+def calculate_letter_frequencies(text, return_counts=False):
+    """
+    Подсчет частоты встречаемости русских букв в тексте
+
+    Параметры:
+        text (str): Текст для анализа
+        return_counts (bool): Вернуть также вектор количеств букв
+
+    Возвращает:
+        dict: {буква: частота} или (dict, np.ndarray) при return_counts=True
+    """
+    counts = letter_counts(text)
+    freq = frequencies_from_counts(counts)
+    if return_counts:
+        return freq, counts
     return freq
 
 
-def calculate_bigram_frequencies(text, step=1):
+def ngram_counts(indices, n=2, step=1):
     """
-    Подсчет частот биграмм (пар букв) в тексте
+    Количества n-грамм соседних символов текста по сетке 33^n
+
+    Учитываются n-граммы text[i:i + n] для i = 0, step, 2*step, ...,
+    состоящие только из русских букв. Номер n-граммы - число из индексов
+    ее букв по основанию 33; все номера считаются одним bincount на блок,
+    поэтому кроме индексного массива память не зависит от длины текста
 
+    Возвращает:
+        np.ndarray: вектор длины 33^n (для n=2 удобно reshape(33, 33))
     """
-    # Приводим текст к верхнему регистру
-    text = text.upper()
+    size = len(RUS_ALPHABET)
+    counts = np.zeros(size ** n, dtype=np.int64)
+    starts_total = len(indices) - n + 1
+    # Размер блока кратен шагу, чтобы начала n-грамм шли с тем же шагом
+    block = max(INDEX_BLOCK_SIZE // step, 1) * step
 
-    # Генерируем все возможные биграммы с заданным шагом
-    # Используем list comprehension для создания списка биграмм
-    bigrams = [text[i:i + 2] for i in range(0, len(text) - 1, step)]
+    for start in range(0, max(starts_total, 0), block):
+        stop = min(start + block, starts_total)
+        ids = np.zeros(len(range(start, stop, step)), dtype=np.int64)
+        valid = np.ones(len(ids), dtype=bool)
+        for offset in range(n):
+            letters = indices[start + offset:stop + offset:step]
+            ids = ids * size + letters
+            valid &= letters != NON_LETTER
+        counts += np.bincount(ids[valid], minlength=size ** n)
+    return counts
 
-    # Фильтруем биграммы, оставляя только те, что состоят из русских букв
-    bigrams = [
-        bg for bg in bigrams
-        if len(bg) == 2 and all(c in RUS_ALPHABET for c in bg)
-    ]
 
-    # Подсчитываем общее количество валидных биграмм
-    total_bigrams = len(bigrams)
+def bigram_matrix(text, step=1):
+    """Матрица 33x33 количеств биграмм: [i, j] - пара (RUS_ALPHABET[i], RUS_ALPHABET[j])"""
+    size = len(RUS_ALPHABET)
+    return ngram_counts(as_indices(text), 2, step).reshape(size, size)
+
+
+def trigram_counts(text, step=1):
+    """Массив 33x33x33 количеств триграмм"""
+    size = len(RUS_ALPHABET)
+    return ngram_counts(as_indices(text), 3, step).reshape(size, size, size)
+
+
+def calculate_bigram_frequencies(text, step=1, return_matrix=False):
+    """
+    Подсчет частот биграмм (пар букв) в тексте
+
+    Параметры:
+        text (str): Текст для анализа
+        step (int): Шаг между началами биграмм
+        return_matrix (bool): Вернуть также полную матрицу 33x33 количеств
+
+    Возвращает:
+        list: топ-10 [(биграмма, частота), ...]
+            или (list, np.ndarray) при return_matrix=True
+    """
+    matrix = bigram_matrix(text, step)
+    top = top_bigrams(matrix)
+    if return_matrix:
+        return top, matrix
+    return top
+
+
+def top_bigrams(matrix, count=10):
+    """Самые частые биграммы по матрице количеств: [(биграмма, частота), ...]"""
+    flat = matrix.ravel()
+    total_bigrams = int(flat.sum())
 
     # Если биграмм нет - возвращаем пустой список
     if total_bigrams == 0:
         return []
 
-    # Используем Counter для подсчета частот биграмм
-    freq = Counter(bigrams)
-
-    # Нормализуем частоты (делим на общее количество) и сортируем по убыванию
-    # Возвращаем топ-10 самых частых биграмм
+    # Сортируем по убыванию частоты (при равенстве - по алфавиту)
+    size = len(RUS_ALPHABET)
+    order = np.argsort(-flat, kind="stable")[:count]
     return [
-        (bg, round(cnt / total_bigrams, 4))
-        for bg, cnt in freq.most_common(10)
+        (RUS_ALPHABET[i // size] + RUS_ALPHABET[i % size], round(int(flat[i]) / total_bigrams, 4))
+        for i in order if flat[i] > 0
     ]
 
 
-def plot_frequencies(freq_dict, title):
+def plot_frequencies(freq_dict, title, output=None, formats=DEFAULT_FORMATS, show=None):
     """
     Визуализация частотного распределения в виде столбчатой диаграммы
 
+    При заданном output график сохраняется (PNG/SVG, частоты - в JSON);
+    окно открывается только при наличии дисплея (см. reporting)
     """
+    plt = get_pyplot()
+
     # Получаем ключи (символы/биграммы) и значения (частоты) из словаря
     labels = list(freq_dict.keys())
     values = list(freq_dict.values())
 
-    plt.figure(figsize=(12, 6))
+    figure = plt.figure(figsize=(12, 6))
     bars = plt.bar(labels, values)
 
     plt.title(title)
@@ -192,7 +399,246 @@ def plot_frequencies(freq_dict, title):
 
     plt.tight_layout()
 
-    plt.show()
+    return finish_figure(figure, output, formats,
+                         data={"title": title, "frequencies": dict(freq_dict)}, show=show)
+
+
+# ==================== ЯЗЫКОВАЯ МОДЕЛЬ (N-ГРАММЫ) ====================
+
+# Каталог модуля: таблицы и образцы текста ищутся рядом с 6.py, а не в текущем каталоге
+MODULE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Готовые таблицы квадграмм. Строятся заранее скриптом build_ngrams.py по корпусам,
+# не пересекающимся с образцами и тестовыми текстами репозитория
+# (caesar_test.txt, Vinzher_test.txt, en_*.txt): русские - переводы сообщений
+# программ (gettext) и русские man-страницы, английские - man-страницы и лицензии
+NGRAM_FILES = {lang: os.path.join(MODULE_DIR, f"ngrams_{lang}.npz") for lang in ("ru", "en")}
+
+# Доля предложений корпуса, отложенных для подбора сглаживания и оценки
+# осмысленного текста (каждое NGRAM_HELDOUT_EVERY-е предложение)
+NGRAM_HELDOUT_EVERY = 10
+
+# Веса частот корпуса, из которых выбирается лучший на отложенной части:
+# p = w * частота n-граммы + (1 - w) * p(независимые буквы). Чем больше корпус,
+# тем меньше в отложенном тексте незнакомых n-грамм и тем ближе w к 1
+NGRAM_WEIGHTS = (0.5, 0.7, 0.8, 0.9, 0.95, 0.97, 0.98, 0.99, 0.995, 0.999)
+
+# Предложения корпуса короче этого числа букв не хэшируются для проверки пересечений
+CORPUS_MIN_SENTENCE = 20
+
+# Сколько символов текста используется для оценки правдоподобия расшифровки
+NGRAM_SAMPLE_SIZE = 5000
+
+# Уточнение ключа Виженера: сколько букв текста оценивается моделью
+# и максимальное число проходов по символам ключа
+REFINE_MAX_LETTERS = 20000
+REFINE_MAX_ROUNDS = 10
+
+# Метод Казиски для больших текстов: сколько первых букв просматривается.
+# Хэши и позиции занимают по 8 байт на символ, а повторов в таком начале
+# хватает (основной метод - индекс совпадений - считается по всему тексту)
+KASISKI_MAX_LETTERS = 1 << 16
+
+# Рекомендуемая длина шифротекста Виженера в символах (для ключей до ~10 букв).
+# Замер на тексте вне корпуса таблиц (caesar_test.txt, ключи 5-9 букв, по 100
+# случайных фрагментов): при известной длине ключа хи-квадрат по столбцам дает
+# 31% / 83% / 97% верных ключей на 100 / 200 / 300 буквах, после уточнения
+# refine_vigenere_key - 100%; полный анализ с определением длины - 86% / 99% / 99%
+# (300 символов с пробелами - около 250 букв, там - 100%)
+MIN_VIGENERE_TEXT_LENGTH = 300
+
+# Сколько лучших по частотам гипотез (ключей Цезаря, длин ключа Виженера)
+# дополнительно сравнивается моделью квадграмм
+NGRAM_RERANK_CANDIDATES = 3
+
+
+def ngram_ids(indices, size, n):
+    """
+    Номера всех n-грамм буквенного потока текста
+
+    Не-буквенные символы пропускаются, номер n-граммы - число из ее
+    индексов букв в системе счисления по основанию size
+    """
+    letters = indices[indices != NON_LETTER].astype(np.int64)
+    count = len(letters) - n + 1
+    if count <= 0:
+        return np.empty(0, dtype=np.int64)
+    ids = np.zeros(count, dtype=np.int64)
+    for offset in range(n):
+        ids = ids * size + letters[offset:offset + count]
+    return ids
+
+
+def split_sentences(text):
+    """Предложения текста (по знакам конца предложения и переводам строк)"""
+    return [sentence for sentence in re.split(r"[.!?…\n]+", text) if sentence.strip()]
+
+
+def sentence_hashes(text, lang="ru"):
+    """
+    32-битные хэши предложений текста (только буквы алфавита, без учета регистра)
+
+    Предложения короче CORPUS_MIN_SENTENCE букв пропускаются: короткие фразы
+    совпадают в любых текстах и пересечения не означают
+    """
+    letters = set(LANGUAGES[lang][0])
+    hashes = set()
+    for sentence in split_sentences(text):
+        normalized = "".join(ch for ch in sentence.upper() if ch in letters)
+        if len(normalized) >= CORPUS_MIN_SENTENCE:
+            digest = hashlib.blake2b(normalized.encode("utf-8"), digest_size=4).digest()
+            hashes.add(int.from_bytes(digest, "big"))
+    return hashes
+
+
+class NgramModel:
+    """
+    Языковая модель на n-граммах букв для оценки правдоподобия текста
+
+    Логарифмы вероятностей всех size ** n n-грамм хранятся одним массивом
+    float16 (для квадграмм русского алфавита - 33^4 ≈ 1.2 млн элементов, 2.4 МБ).
+    Оценка текста - средний логарифм вероятности его n-грамм.
+    corpus_hashes - хэши предложений корпуса (sentence_hashes) для проверки,
+    что оцениваемые тексты не взяты из корпуса
+    """
+
+    def __init__(self, lang, n, log_probs, text_score, random_score, weight=0.0,
+                 corpus_hashes=None):
+        self.lang = lang
+        self.n = n
+        self.size = len(LANGUAGES[lang][0])
+        self.log_probs = log_probs
+        # Средние оценки n-граммы осмысленного текста и случайных букв
+        self.text_score = text_score
+        self.random_score = random_score
+        self.weight = weight
+        self.corpus_hashes = np.asarray(
+            corpus_hashes if corpus_hashes is not None else [], dtype=np.uint32
+        )
+
+    def score(self, indices):
+        """Средний логарифм вероятности n-граммы для индексного массива текста"""
+        ids = ngram_ids(indices, self.size, self.n)
+        if len(ids) == 0:
+            return self.random_score
+        return float(self.log_probs[ids].mean(dtype=np.float64))
+
+    def is_plausible(self, indices):
+        """Проверка, ближе ли оценка текста к осмысленному тексту, чем к случайному"""
+        return self.score(indices) > (self.text_score + self.random_score) / 2
+
+    def corpus_overlap(self, text):
+        """Доля предложений text (от CORPUS_MIN_SENTENCE букв), встречающихся в корпусе модели"""
+        hashes = sentence_hashes(text, self.lang)
+        if not hashes:
+            return 0.0
+        found = np.isin(np.fromiter(hashes, dtype=np.uint32), self.corpus_hashes)
+        return float(found.mean())
+
+
+def _corpus_counts(texts, lang, n):
+    """Частоты n-грамм по текстам (каждый текст - отдельный поток букв)"""
+    size = len(LANGUAGES[lang][0])
+    counts = np.zeros(size ** n, dtype=np.int64)
+    for text in texts:
+        counts += np.bincount(ngram_ids(text_to_indices(text, lang), size, n),
+                              minlength=size ** n)
+    return counts
+
+
+def build_ngram_model(lang="ru", corpus_texts=(), n=4):
+    """
+    Построение модели n-грамм по текстам корпуса
+
+    Частоты n-грамм корпуса смешиваются с моделью независимых букв
+    (произведение эталонных частот), поэтому у n-грамм, которых нет
+    в корпусе, вероятность не нулевая. Каждое NGRAM_HELDOUT_EVERY-е
+    предложение корпуса откладывается: вес частот корпуса из NGRAM_WEIGHTS
+    выбирается по наибольшему правдоподобию отложенной части, по ней же
+    считается ожидаемая оценка осмысленного текста. Без корпуса получается
+    модель независимых букв
+    """
+    alphabet, letter_freq = LANGUAGES[lang]
+    letter_probs = np.array([letter_freq[letter] for letter in alphabet])
+    letter_probs /= letter_probs.sum()
+
+    # Вероятности n-грамм при независимых буквах: произведение по всем позициям
+    independent = np.ones(1)
+    for _ in range(n):
+        independent = np.outer(independent, letter_probs).ravel()
+
+    train, heldout = [], []
+    for text in corpus_texts:
+        for i, sentence in enumerate(split_sentences(text)):
+            (heldout if i % NGRAM_HELDOUT_EVERY == NGRAM_HELDOUT_EVERY - 1 else train).append(sentence)
+    counts = _corpus_counts(["\n".join(train)], lang, n)
+    total = int(counts.sum())
+    heldout_counts = _corpus_counts(["\n".join(heldout)], lang, n)
+    heldout_total = int(heldout_counts.sum())
+
+    if not total or not heldout_total:
+        log_probs = np.log(independent)
+        return NgramModel(lang, n, log_probs.astype(np.float16),
+                          float((independent * log_probs).sum()), float(log_probs.mean()))
+
+    frequencies = counts / total
+    seen = np.flatnonzero(heldout_counts)
+
+    def heldout_score(weight):
+        probs = weight * frequencies[seen] + (1 - weight) * independent[seen]
+        return float((heldout_counts[seen] * np.log(probs)).sum()) / heldout_total
+
+    weight = max(NGRAM_WEIGHTS, key=heldout_score)
+    log_probs = np.log(weight * frequencies + (1 - weight) * independent)
+    hashes = set()
+    for text in corpus_texts:
+        hashes |= sentence_hashes(text, lang)
+    return NgramModel(
+        lang, n, log_probs.astype(np.float16), heldout_score(weight), float(log_probs.mean()),
+        weight, sorted(hashes),
+    )
+
+
+def save_ngram_model(model, filename):
+    """Сохранение таблицы модели в сжатый файл .npz"""
+    np.savez_compressed(
+        filename, log_probs=model.log_probs, lang=model.lang, n=model.n,
+        text_score=model.text_score, random_score=model.random_score,
+        weight=model.weight, corpus_hashes=model.corpus_hashes,
+    )
+
+
+def load_ngram_model(filename):
+    """Загрузка модели из файла, сохраненного save_ngram_model"""
+    with np.load(filename) as data:
+        return NgramModel(
+            str(data["lang"]), int(data["n"]), data["log_probs"],
+            float(data["text_score"]), float(data["random_score"]),
+            float(data["weight"]), data["corpus_hashes"],
+        )
+
+
+def build_ngram_file(corpus_filenames, lang="ru", filename=None, n=4):
+    """Построение таблицы по файлам корпуса и сохранение ее для get_ngram_model"""
+    texts = [read_file(name) for name in corpus_filenames]
+    model = build_ngram_model(lang, [text for text in texts if text], n)
+    save_ngram_model(model, filename or NGRAM_FILES[lang])
+    return model
+
+
+@lru_cache(maxsize=None)
+def get_ngram_model(lang="ru"):
+    """
+    Модель квадграмм для языка lang из готовой таблицы NGRAM_FILES
+
+    Без таблицы (например, удаленной) - с предупреждением модель
+    независимых букв: ключи находятся, но хуже на коротких текстах
+    """
+    if os.path.exists(NGRAM_FILES[lang]):
+        return load_ngram_model(NGRAM_FILES[lang])
+    print(f"Внимание: нет таблицы квадграмм {NGRAM_FILES[lang]}, "
+          f"используется модель независимых букв (см. build_ngrams.py)")
+    return build_ngram_model(lang)
 
 
 # ==================== КРИПТОАНАЛИЗ ШИФРА ЦЕЗАРЯ ====================
@@ -208,52 +654,119 @@ def caesar_decrypt(text, key):
     Возвращает:
         str: Расшифрованный текст
     """
-    decrypted = []  # Список для хранения расшифрованных символов
+    # Таблица замены кодека строится один раз на ключ, а весь текст
+    # сдвигается одним вызовом str.translate (регистр сохраняется)
+    return text.translate(_caesar_table(key % len(RUS_ALPHABET)))
 
-    # Перебираем каждый символ в тексте
-    for ch in text:
-        # Проверяем, является ли символ русской буквой
-        if ch.upper() in RUS_ALPHABET:
-            # Вычисляем новый индекс для символа
-            idx = (RUS_ALPHABET.index(ch.upper()) - key) % 33
 
-            # Добавляем букву в нужном регистре
-            if ch.isupper():
-                decrypted.append(RUS_ALPHABET[idx])
-            else:
-                decrypted.append(RUS_ALPHABET_LOWER[idx])
-        else:
-            # Не-буквенные символы добавляем без изменений
-            decrypted.append(ch)
+@lru_cache(maxsize=33)
+def _caesar_table(key):
+    """Таблица str.translate для дешифровки русских букв со сдвигом key"""
+    return RUS_CODEC.translation(-key)
+
+
+def shift_chi_squared(counts):
+    """
+    Статистика хи-квадрат для всех 33 сдвигов одной матричной операцией
+
+    Параметры:
+        counts (np.ndarray): вектор (33,) количеств букв шифротекста
+            или матрица (m, 33) - по строке на каждую группу (столбец Виженера)
+
+    Возвращает:
+        np.ndarray: (33,) или (m, 33), элемент [..., k] - хи-квадрат
+        расшифровки с ключом k относительно RUS_LETTER_FREQ
+    """
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum(axis=-1, keepdims=True)
+
+    # observed[..., k, j] - сколько раз в шифротексте встречается буква,
+    # в которую переходит j-я буква при сдвиге k (без расшифровки текста)
+    observed = counts[..., SHIFT_INDEX]
+    expected = total[..., None] * RUS_FREQ_VECTOR
+
+    # Для групп без букв все сдвиги равноценны - хи-квадрат равен 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chi2 = ((observed - expected) ** 2 / expected).sum(axis=-1)
+    return np.nan_to_num(chi2)
+
+
+def caesar_rank_shifts(ciphertext):
+    """
+    Ранжирование всех ключей Цезаря по статистике хи-квадрат
+
+    Уверенность - нормированное правдоподобие ключа exp(-хи2 / 2)
+    среди всех 33 вариантов
+
+    Параметры:
+        ciphertext: Зашифрованный текст (str) или его индексный массив
 
-    # Собираем список символов в строку и возвращаем
-    return ''.join(decrypted)
+    Возвращает:
+        list: [(ключ, хи-квадрат, уверенность), ...] от лучшего к худшему
+    """
+    return rank_shifts_from_counts(letter_counts(ciphertext))
+
+
+def rank_shifts_from_counts(counts):
+    """Ранжирование ключей Цезаря по готовому вектору количеств букв"""
+    chi2 = shift_chi_squared(counts)
+
+    # Вычитаем минимум, чтобы экспонента не обнулилась на длинных текстах
+    weights = np.exp(-(chi2 - chi2.min()) / 2)
+    confidence = weights / weights.sum()
+
+    order = np.argsort(chi2, kind="stable")
+    return [(int(k), float(chi2[k]), float(confidence[k])) for k in order]
+
+
+def caesar_find_key(ciphertext):
+    """
+    Поиск ключа Цезаря без дешифровки текста
+
+    Все 33 сдвига оцениваются сразу по статистике хи-квадрат, лучшие
+    из них сравниваются моделью квадграмм
 
+    Параметры:
+        ciphertext: Зашифрованный текст (str) или его индексный массив
+
+    Возвращает:
+        tuple: (найденный ключ, ранжирование [(ключ, хи-квадрат, уверенность), ...])
+    """
+    ranking = caesar_rank_shifts(ciphertext)
+
+    # Из нескольких лучших по хи-квадрат ключей выбираем лучший по модели
+    # квадграмм: сдвигается только индексный массив начала текста
+    model = get_ngram_model()
+    sample = as_indices(ciphertext[:NGRAM_SAMPLE_SIZE])
+    key = max(
+        (candidate for candidate, _, _ in ranking[:NGRAM_RERANK_CANDIDATES]),
+        key=lambda candidate: model.score(shift_indices(sample, [candidate])),
+    )
+    return key, ranking
 
-def caesar_cryptanalysis(ciphertext):
+
+def caesar_cryptanalysis(ciphertext, return_ranking=False):
     """
     Автоматический криптоанализ шифра Цезаря методом частотного анализа
 
+    Ключ выбирается caesar_find_key, а текст расшифровывается
+    один раз - с выбранным ключом
+
     Параметры:
         ciphertext (str): Зашифрованный текст
+        return_ranking (bool): Вернуть также ранжированный список ключей
 
     Возвращает:
         tuple: (найденный ключ, расшифрованный текст)
+            или (ключ, текст, ранжирование) при return_ranking=True
     """
-    # Вычисляем частоты букв в зашифрованном тексте
-    freq = calculate_letter_frequencies(ciphertext)
-
-    # Находим букву с максимальной частотой
-    most_common = max(freq.items(), key=lambda x: x[1])[0]
-
-    # Вычисляем ключ как разность между позицией самой частой буквы в шифротексте
-    # и позицией буквы 'О' (самой частой в русском языке)
-    key = (RUS_ALPHABET.index(most_common) - RUS_ALPHABET.index('О')) % 33
+    key, ranking = caesar_find_key(ciphertext)
 
     # Дешифруем текст с найденным ключом
     decrypted_text = caesar_decrypt(ciphertext, key)
 
-    # Возвращаем ключ и расшифрованный текст
+    if return_ranking:
+        return key, decrypted_text, ranking
     return key, decrypted_text
 
 
@@ -291,9 +804,11 @@ def find_repeated_sequences(text, min_len=3):
     return {seq: pos for seq, pos in sequences.items() if len(pos) > 1}
 
 
-def estimate_key_length(ciphertext):
+def estimate_key_length_gcd(ciphertext):
     """
-    Оценка длины ключа шифра Виженера методом Казиски
+    Оценка длины ключа шифра Виженера методом Казиски через НОД всех расстояний
+
+    Прежняя реализация: оставлена для сравнения в benchmark_key_length
 
     Параметры:
         ciphertext (str): Зашифрованный текст
@@ -331,72 +846,468 @@ def estimate_key_length(ciphertext):
     return current_gcd if current_gcd > 1 else None
 
 
-def try_vigenere_decrypt(ciphertext, key_length):
+def kasiski_distances(ciphertext, min_len=3, max_len=5, max_letters=KASISKI_MAX_LETTERS):
+    """
+    Расстояния между соседними повторами буквенных последовательностей (метод Казиски)
+
+    Вместо словаря всех подстрок каждая последовательность длины min_len..max_len
+    кодируется полиномиальным хэшем по основанию 33, который считается сразу для
+    всех позиций текста. Для букв (индексы < 33) хэш точен - коллизий нет.
+    Повторы находятся сортировкой хэшей. Просматриваются только первые
+    max_letters букв текста, чтобы память не росла с длиной файла
+
+    Параметры:
+        ciphertext (str): Зашифрованный текст
+        max_letters (int): Сколько первых букв текста просматривается
+
+    Возвращает:
+        np.ndarray: расстояния между соседними вхождениями одинаковых последовательностей
+    """
+    indices = letter_prefix(as_indices(ciphertext), max_letters)
+    values = indices.astype(np.int64)
+    is_letter = indices != NON_LETTER
+    distances = []
+
+    for length in range(min_len, max_len + 1):
+        count = len(indices) - length + 1
+        if count <= 1:
+            continue
+
+        # Хэш окна [i, i + length) и признак того, что в окне только буквы
+        hashes = np.zeros(count, dtype=np.int64)
+        valid = np.ones(count, dtype=bool)
+        for offset in range(length):
+            hashes = hashes * 33 + values[offset:offset + count]
+            valid &= is_letter[offset:offset + count]
+
+        positions = np.flatnonzero(valid)
+        hashes = hashes[positions]
+
+        # Устойчивая сортировка сохраняет порядок вхождений одной последовательности,
+        # поэтому разности соседних позиций с равным хэшем - расстояния между повторами
+        order = np.argsort(hashes, kind="stable")
+        hashes = hashes[order]
+        positions = positions[order]
+        same = hashes[1:] == hashes[:-1]
+        distances.append(positions[1:][same] - positions[:-1][same])
+
+    if not distances:
+        return np.empty(0, dtype=np.int64)
+    return np.concatenate(distances)
+
+
+def estimate_key_length_kasiski(ciphertext, max_key_length=20):
+    """
+    Оценка длины ключа по расстояниям между повторами (быстрый метод Казиски)
+
+    Вместо НОД всех расстояний, который от одного случайного повтора
+    падает до 1, для каждой длины L считается доля расстояний, кратных L,
+    за вычетом доли 1/L, ожидаемой случайно
+
+    Возвращает:
+        int: Предполагаемая длина ключа или None если не удалось определить
+    """
+    check_max_key_length(max_key_length)
+    distances = kasiski_distances(ciphertext)
+    # Метод проверяет длины от 2: при max_key_length = 1 проверять нечего
+    if len(distances) == 0 or max_key_length < 2:
+        return None
+
+    lengths = np.arange(2, max_key_length + 1)
+    share = (distances[None, :] % lengths[:, None] == 0).mean(axis=1)
+    scores = share - 1 / lengths
+    best = int(np.argmax(scores))
+    return int(lengths[best]) if scores[best] > 0 else None
+
+
+def column_counts(indices, key_length, offset=0):
+    """
+    Количества букв в каждом столбце текста при длине ключа key_length
+
+    Столбец i - символы на позициях i, i + L, i + 2L, ... (позиции считаются
+    по всему тексту, как у шифра Виженера из 4.py). Все столбцы считаются
+    bincount по составному индексу (номер столбца, буква); текст обрабатывается
+    блоками, чтобы временные массивы не зависели от его длины.
+    offset - позиция indices в полном тексте (при обработке текста по частям)
+
+    Возвращает:
+        np.ndarray: матрица (key_length, 33)
+    """
+    bins = key_length * (NON_LETTER + 1)
+    counts = np.zeros(bins, dtype=np.int64)
+    for start in range(0, len(indices), INDEX_BLOCK_SIZE):
+        block = indices[start:start + INDEX_BLOCK_SIZE]
+        columns = np.arange(offset + start, offset + start + len(block)) % key_length
+        counts += np.bincount(columns * (NON_LETTER + 1) + block, minlength=bins)
+    return counts.reshape(key_length, NON_LETTER + 1)[:, :len(RUS_ALPHABET)]
+
+
+def index_of_coincidence(counts):
+    """
+    Индекс совпадений по количествам букв
+
+    Параметры:
+        counts (np.ndarray): вектор (33,) или матрица (m, 33)
+
+    Возвращает:
+        float или np.ndarray (m,): вероятность того, что две случайно
+        выбранные буквы группы совпадают
+    """
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum(axis=-1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ic = (counts * (counts - 1)).sum(axis=-1) / (total * (total - 1))
+    return np.nan_to_num(ic)
+
+
+def check_max_key_length(max_key_length):
+    """Проверка максимальной длины ключа для оценок длины (ValueError, если меньше 1)"""
+    if max_key_length < 1:
+        raise ValueError(f"Максимальная длина ключа должна быть не меньше 1, получено {max_key_length}")
+
+
+def key_length_ic(ciphertext, max_key_length=20):
+    """
+    Средний индекс совпадений столбцов для каждой длины ключа 1..max_key_length
+
+    Индексный массив строится один раз, каждая длина - один проход по нему
+
+    Возвращает:
+        np.ndarray: элемент [L - 1] - средний IC столбцов при длине ключа L
+    """
+    check_max_key_length(max_key_length)
+    indices = as_indices(ciphertext)
+    return np.array([
+        index_of_coincidence(column_counts(indices, length)).mean()
+        for length in range(1, max_key_length + 1)
+    ])
+
+
+def estimate_key_length_ic(ciphertext, max_key_length=20):
+    """
+    Оценка длины ключа шифра Виженера по индексу совпадений (метод Фридмана)
+
+    При верной длине ключа (и кратных ей) каждый столбец зашифрован одним
+    сдвигом, и его IC близок к IC русского текста (RUS_IC); при неверной
+    столбцы смешивают несколько сдвигов, и IC ближе к случайному (RANDOM_IC).
+    Выбирается наименьшая длина, IC которой близок к лучшему
+
+    Возвращает:
+        int: Предполагаемая длина ключа или None если не удалось определить
+    """
+    return choose_key_length(key_length_ic(ciphertext, max_key_length))
+
+
+def choose_key_length(ics):
+    """
+    Выбор длины ключа по средним IC столбцов (элемент [L - 1] - для длины L)
+
+    Возвращает:
+        int: наименьшая длина с IC, близким к лучшему, или None
+    """
+    best = ics.max()
+
+    # Даже лучшая длина не дает IC, похожего на осмысленный текст
+    if best < (RUS_IC + RANDOM_IC) / 2:
+        return None
+
+    threshold = RANDOM_IC + 0.75 * (best - RANDOM_IC)
+    return int(np.argmax(ics >= threshold)) + 1
+
+
+def estimate_key_length(ciphertext, max_key_length=20):
+    """
+    Оценка длины ключа шифра Виженера
+
+    Основной метод - индекс совпадений, при неудаче - быстрый метод Казиски
+
+    Параметры:
+        ciphertext (str): Зашифрованный текст
+        max_key_length (int): Максимальная проверяемая длина ключа
+
+    Возвращает:
+        int: Предполагаемая длина ключа или None если не удалось определить
+    """
+    check_max_key_length(max_key_length)
+    key_length = estimate_key_length_ic(ciphertext, max_key_length)
+    if key_length is None:
+        key_length = estimate_key_length_kasiski(ciphertext, max_key_length)
+    return key_length
+
+
+def shift_indices(indices, shifts, sign=-1, offset=0):
+    """
+    Векторный сдвиг индексного массива по периодическому ключу
+
+    Буква на позиции i сдвигается на sign * shifts[(offset + i) % len(shifts)]
+    (sign=-1 - дешифровка, sign=1 - шифрование), метки NON_LETTER
+    остаются на месте. Позволяет оценивать расшифровку, не собирая текст.
+    Массив обрабатывается блоками, чтобы временные массивы не росли с текстом
+    """
+    # Сдвиг заранее приводится к 0..32, тогда сумма помещается в uint8
+    # (метки NON_LETTER при переполнении все равно заменяются ниже)
+    shifts = ((sign * np.asarray(shifts, dtype=np.int64)) % 33).astype(np.uint8)
+    period = len(shifts)
+    result = np.empty(len(indices), dtype=np.uint8)
+    for start in range(0, len(indices), INDEX_BLOCK_SIZE):
+        block = indices[start:start + INDEX_BLOCK_SIZE]
+        phase = (offset + start + np.arange(len(block))) % period
+        shifted = (block + shifts[phase]) % 33
+        result[start:start + len(block)] = np.where(block != NON_LETTER, shifted, NON_LETTER)
+    return result
+
+
+def apply_key_shifts(text, shifts, sign=-1, indices=None, offset=0):
+    """
+    Векторный сдвиг русских букв текста по периодическому ключу
+
+    Буква на позиции i сдвигается на sign * shifts[(offset + i) % len(shifts)]
+    одним действием для всего текста (sign=-1 - дешифровка, sign=1 - шифрование).
+    Регистр букв и не-буквенные символы сохраняются
+
+    Параметры:
+        text (str): Исходный текст
+        shifts: Сдвиги (индексы букв ключа в RUS_ALPHABET)
+        indices (np.ndarray): Готовый индексный массив text (если уже построен)
+        offset (int): Позиция text в полном тексте (при обработке по частям)
+    """
+    return RUS_CODEC.shift(text, shifts, sign, offset, indices)
+
+
+def decrypt_file(src_filename, dst_filename, shifts, chunk_size=INDEX_BLOCK_SIZE):
+    """
+    Потоковая дешифровка файла по сдвигам ключа (Цезарь - один сдвиг)
+
+    Файл читается частями по chunk_size символов; позиция части в тексте
+    передается в apply_key_shifts, поэтому ключ не сбивается на стыках.
+    Весь текст в памяти не хранится
+
+    Возвращает:
+        str: Первые 200 символов расшифровки (для предпросмотра)
+    """
+    preview = ""
+    position = 0
+    with open(src_filename, "r", encoding="utf-8") as src, \
+            open(dst_filename, "w", encoding="utf-8") as dst:
+        while True:
+            chunk = src.read(chunk_size)
+            if not chunk:
+                break
+            decrypted = apply_key_shifts(chunk, shifts, offset=position)
+            dst.write(decrypted)
+            if len(preview) < 200:
+                preview += decrypted[:200 - len(preview)]
+            position += len(chunk)
+    return preview
+
+
+def vigenere_key_shifts(indices, key_length):
+    """Сдвиги ключа заданной длины: для каждого столбца - наименьший хи-квадрат"""
+    return np.argmin(shift_chi_squared(column_counts(indices, key_length)), axis=1)
+
+
+def refine_vigenere_key(indices, shifts, model=None, max_letters=REFINE_MAX_LETTERS,
+                        max_rounds=REFINE_MAX_ROUNDS):
+    """
+    Уточнение ключа Виженера восхождением к вершине (hill climbing)
+
+    Начиная с ключа, подобранного по частотам столбцов, по очереди для каждого
+    символа ключа перебираются все 33 значения и берется то, при котором
+    оценка модели n-грамм максимальна; проходы повторяются, пока ключ меняется.
+    Оценка пересчитывается инкрементально: при смене символа ключа меняются
+    только n-граммы, содержащие буквы его столбца, и только они
+    пересчитываются (сразу для всех 33 значений)
+
+    Параметры:
+        indices (np.ndarray): Индексный массив шифротекста
+        shifts: Начальные сдвиги ключа
+        model (NgramModel): Языковая модель (по умолчанию - русские квадграммы)
+        max_letters (int): Сколько первых букв текста используется для оценки
+        max_rounds (int): Максимальное число проходов по ключу
+
+    Возвращает:
+        tuple: (уточненные сдвиги np.ndarray, оценка модели на букву)
+    """
+    model = model or get_ngram_model()
+    n = model.n
+    shifts = np.array(shifts, dtype=np.int64)
+    key_length = len(shifts)
+
+    # Буквенный поток шифротекста и столбец (символ ключа) каждой буквы;
+    # позиции ищутся только в начале массива, где лежат max_letters букв
+    positions = np.flatnonzero(letter_prefix(indices, max_letters) != NON_LETTER)
+    cipher = indices[positions].astype(np.int64)
+    columns = positions % key_length
+    count = len(cipher) - n + 1
+    if count <= 0:
+        return shifts, model.random_score
+
+    plain = (cipher - shifts[columns]) % 33
+    weights = model.size ** np.arange(n - 1, -1, -1)
+    offsets = np.arange(n)
+
+    # Для каждого столбца - начала n-грамм, в которые входит хотя бы одна его буква
+    affected = []
+    for column in range(key_length):
+        letters = np.flatnonzero(columns == column)
+        starts = (letters[:, None] - offsets[None, :]).ravel()
+        affected.append(np.unique(starts[(starts >= 0) & (starts < count)]))
+
+    all_windows = np.arange(count)[:, None] + offsets
+    total = model.log_probs[plain[all_windows] @ weights].sum(dtype=np.float64)
+    candidates = np.arange(33)[:, None, None]
+
+    for _ in range(max_rounds):
+        changed = False
+        for column in range(key_length):
+            windows = affected[column][:, None] + offsets
+            if len(windows) == 0:
+                continue
+            current = plain[windows]
+            in_column = columns[windows] == column
+
+            # Все 33 варианта символа ключа сразу: массив (33, n-граммы, n)
+            variants = np.where(in_column, (cipher[windows] - candidates) % 33, current)
+            scores = model.log_probs[variants @ weights].sum(axis=1, dtype=np.float64)
+            best = int(np.argmax(scores))
+
+            if best != shifts[column] and scores[best] > scores[shifts[column]] + 1e-9:
+                total += scores[best] - scores[shifts[column]]
+                shifts[column] = best
+                letters = columns == column
+                plain[letters] = (cipher[letters] - best) % 33
+                changed = True
+        if not changed:
+            break
+
+    return shifts, float(total / count)
+
+
+def try_vigenere_decrypt(ciphertext, key_length, indices=None, refine=True):
     """
     Попытка дешифровки шифра Виженера с заданной длиной ключа
 
+    Текст один раз переводится в индексный массив; количества букв во всех
+    столбцах считаются за один проход, символ ключа для каждого столбца
+    выбирается по хи-квадрат как в шифре Цезаря и затем уточняется
+    refine_vigenere_key, а дешифровка выполняется одним векторным вычитанием
+
     Параметры:
         ciphertext (str): Зашифрованный текст
         key_length (int): Предполагаемая длина ключа
+        indices (np.ndarray): Готовый индексный массив текста (при переборе длин)
+        refine (bool): Уточнять ключ по модели n-грамм
 
     Возвращает:
         tuple: (предполагаемый ключ, расшифрованный текст)
     """
-    # Приводим текст к верхнему регистру для единообразия
-    ciphertext_upper = ciphertext.upper()
-    key = []  # Список для хранения символов ключа
+    if indices is None:
+        indices = text_to_indices(ciphertext)
 
-    # Анализируем каждую группу символов, зашифрованных одним символом ключа
-    for i in range(key_length):
-        # Собираем подгруппу символов
-        subgroup = [
-            c for j, c in enumerate(ciphertext_upper)
-            if j % key_length == i and c in RUS_ALPHABET
-        ]
-        subgroup_text = ''.join(subgroup)
+    # Каждый столбец - отдельный шифр Цезаря: берем сдвиг с наименьшим хи-квадрат
+    shifts = vigenere_key_shifts(indices, key_length)
+    if refine:
+        shifts, _ = refine_vigenere_key(indices, shifts)
+    key = ''.join(RUS_ALPHABET[shift] for shift in shifts)
 
-        # Анализируем подгруппу как отдельный шифр Цезаря
-        subgroup_freq = calculate_letter_frequencies(subgroup_text)
+    # Возвращаем ключ и расшифрованный текст
+    return key, apply_key_shifts(ciphertext, shifts, indices=indices)
 
-        # Находим самую частую букву в подгруппе
-        most_common = max(subgroup_freq.items(), key=lambda x: x[1])[0]
 
-        # Определяем символ ключа для этой подгруппы
-        # Предполагаем, что самая частая буква соответствует 'О'
-        key_char = RUS_ALPHABET[
-            (RUS_ALPHABET.index(most_common) - RUS_ALPHABET.index('О')) % 33
-            ]
-        key.append(key_char)
+def score_key_length(indices, key_length):
+    """
+    Оценка гипотезы о длине ключа без расшифровки текста
 
-    # Собираем символы ключа в строку
-    key = ''.join(key)
+    Для каждого столбца выбирается сдвиг с наименьшим хи-квадрат, затем
+    считается средний на букву логарифм правдоподобия расшифровки
+    относительно RUS_LETTER_FREQ. Из него вычитается штраф ln(33) на
+    каждый символ ключа (выбор одного из 33 сдвигов на столбец), иначе
+    длинные ключи с короткими столбцами подгонялись бы под частоты
 
-    # Дешифруем текст с найденным ключом
-    decrypted = []
-    for i, ch in enumerate(ciphertext):
-        if ch.upper() in RUS_ALPHABET:
-            # Определяем сдвиг для текущей позиции
-            shift = RUS_ALPHABET.index(key[i % key_length].upper())
-
-            # Вычисляем индекс исходной буквы
-            idx = (RUS_ALPHABET.index(ch.upper()) - shift) % 33
-
-            # Добавляем букву в нужном регистре
-            if ch.isupper():
-                decrypted.append(RUS_ALPHABET[idx])
-            else:
-                decrypted.append(RUS_ALPHABET_LOWER[idx])
-        else:
-            # Не-буквенные символы оставляем без изменений
-            decrypted.append(ch)
+    Возвращает:
+        tuple: (сдвиги ключа np.ndarray, оценка - чем больше, тем лучше)
+    """
+    counts = column_counts(indices, key_length)
+    shifts = np.argmin(shift_chi_squared(counts), axis=1)
+    total = counts.sum()
+    if total == 0:
+        return shifts, float("-inf")
 
-    # Возвращаем ключ и расшифрованный текст
-    return key, ''.join(decrypted)
+    # observed[c, j] - сколько букв столбца c расшифровывается в j-ю букву алфавита
+    observed = counts[np.arange(key_length)[:, None], SHIFT_INDEX[shifts]]
+    log_likelihood = float((observed * RUS_LOG_FREQ).sum()) / total
+    return shifts, log_likelihood - key_length * np.log(33) / total
+
+
+# Относительный допуск, с которым оценки длин ключа считаются равными
+KEY_SCORE_TOLERANCE = 1e-3
+
+# Индексный массив шифротекста в процессе-воркере параллельного перебора
+_shared_indices = None
+_shared_memory = None
+
+
+def _init_key_search_worker(name, size):
+    """Инициализация воркера: подключение к общей памяти с индексным массивом"""
+    global _shared_indices, _shared_memory
+    _shared_memory = shared_memory.SharedMemory(name=name)
+    _shared_indices = np.ndarray((size,), dtype=np.uint8, buffer=_shared_memory.buf)
+
+
+def _score_key_length_worker(key_length):
+    """Оценка одной длины ключа в воркере по массиву из общей памяти"""
+    shifts, score = score_key_length(_shared_indices, key_length)
+    return key_length, shifts, score
+
+
+def parallel_key_search(ciphertext, max_key_length=100, min_key_length=2, workers=None):
+    """
+    Параллельный перебор длин ключа Виженера в пуле процессов
+
+    Индексный массив шифротекста один раз копируется в общую память, и все
+    воркеры читают его без копирования. Каждая длина min..max_key_length
+    оценивается score_key_length; из почти равных оценок (длины, кратные
+    верной, дают ту же расшифровку) выбирается наименьшая длина
+
+    Возвращает:
+        list: [(длина, ключ, оценка), ...] от лучшей гипотезы к худшей
+    """
+    indices = as_indices(ciphertext)
+    lengths = range(min_key_length, max_key_length + 1)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(len(indices), 1))
+    try:
+        np.ndarray(indices.shape, dtype=np.uint8, buffer=shm.buf)[:] = indices
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_key_search_worker,
+                                 initargs=(shm.name, len(indices))) as executor:
+            scored = list(executor.map(_score_key_length_worker, lengths))
+    finally:
+        shm.close()
+        shm.unlink()
+
+    # Из оставшихся гипотез берется лучшая оценка, а среди оценок, равных ей
+    # с точностью KEY_SCORE_TOLERANCE (кратные длины с той же расшифровкой), -
+    # самый короткий ключ
+    remaining = sorted(scored, key=lambda item: (-item[2], item[0]))
+    ranking = []
+    while remaining:
+        best = remaining[0][2]
+        chosen = min(
+            (item for item in remaining
+             if math.isclose(item[2], best, rel_tol=KEY_SCORE_TOLERANCE)),
+            key=lambda item: item[0],
+        )
+        remaining.remove(chosen)
+        ranking.append(chosen)
+    return [
+        (length, ''.join(RUS_ALPHABET[shift] for shift in shifts), score)
+        for length, shifts, score in ranking
+    ]
 
 
 def is_likely_correct(text):
     """
-    Проверка правдоподобности расшифрованного текста
+    Проверка правдоподобности расшифрованного текста по модели квадграмм
 
     Параметры:
         text (str): Текст для проверки
@@ -404,56 +1315,255 @@ def is_likely_correct(text):
     Возвращает:
         bool: True если текст похож на правильный русский текст
     """
-    # Берем первые 200 символов для анализа
-    sample = text[:200].upper()
+    return get_ngram_model().is_plausible(text_to_indices(text[:NGRAM_SAMPLE_SIZE]))
+
+
+def vigenere_find_key(ciphertext, max_key_length=10, parallel=False, workers=None):
+    """
+    Поиск ключа Виженера без дешифровки текста
+
+    Все этапы работают с индексным массивом, поэтому вместо текста можно
+    передать результат read_indices для файла, не помещающегося в память
+
+    Параметры:
+        ciphertext: Зашифрованный текст (str) или его индексный массив
+        max_key_length (int): Максимальная длина ключа для перебора
+        parallel (bool): Перебирать длины ключа в пуле процессов
+        workers (int): Число процессов для параллельного перебора
+
+    Возвращает:
+        np.ndarray: сдвиги ключа (индексы букв в RUS_ALPHABET) или None при неудаче
+    """
+    # Индексный массив строится один раз для всех этапов
+    indices = as_indices(ciphertext)
+
+    # Этап 1: Определение длины ключа (индекс совпадений, метод Казиски)
+    key_length = estimate_key_length(indices, max_key_length)
+
+    # Если длину не удалось определить или ключ слишком длинный
+    if key_length is None or key_length > max_key_length:
+        print("Длину ключа определить не удалось, пробуем перебор...")
+
+        # Гипотезы оцениваются моделью квадграмм по расшифровке начала
+        # индексного массива
+        model = get_ngram_model()
+        sample = indices[:NGRAM_SAMPLE_SIZE]
+
+        if parallel:
+            # Лучшие по частотам гипотезы уточняются моделью квадграмм;
+            # сдвиги берутся из найденных ключей без повторного прохода по столбцам
+            ranking = parallel_key_search(indices, max_key_length, workers=workers)
+            candidates = [(length, np.array([RUS_ALPHABET.index(letter) for letter in key]))
+                          for length, key, _ in ranking[:NGRAM_RERANK_CANDIDATES]]
+        else:
+            # Перебираем возможные длины ключа от 2 до max_key_length
+            candidates = []
+            for possible_length in range(2, max_key_length + 1):
+                print(f"Проверяем длину ключа: {possible_length}")
+                candidates.append((possible_length, vigenere_key_shifts(indices, possible_length)))
+
+        # Выбираем лучшую гипотезу; кратные верной длине дают ту же расшифровку
+        # и ту же оценку, поэтому при равенстве остается более короткий ключ
+        best_length, best_shifts, best_score = None, None, None
+        for length, shifts in candidates:
+            score = model.score(shift_indices(sample, shifts))
+            if best_score is None or score > best_score + 1e-9 or (
+                    abs(score - best_score) <= 1e-9 and length < best_length):
+                best_length, best_shifts, best_score = length, shifts, score
+
+        # Уточняем ключ лучшей гипотезы; если правдоподобной расшифровки
+        # нет и после этого - ключ не найден
+        if best_shifts is None:
+            return None
+        best_shifts, _ = refine_vigenere_key(indices, best_shifts, model)
+        if not model.is_plausible(shift_indices(sample, best_shifts)):
+            return None
+
+        print(f"Лучшая длина ключа: {best_length}")
+        return best_shifts
 
-    # Считаем количество самых частых русских букв в тексте
-    common_rus_letters = sum(sample.count(c) for c in 'ОЕАИНТ')
+    # Если длина ключа определена успешно
+    print(f"Предполагаемая длина ключа: {key_length}")
 
-    # Эмпирическая проверка: в нормальном тексте таких букв должно быть много
-    return common_rus_letters > 50
+    # Этап 2: Определение самого ключа: каждый столбец - шифр Цезаря,
+    # затем уточнение по модели n-грамм
+    shifts, _ = refine_vigenere_key(indices, vigenere_key_shifts(indices, key_length))
+    return shifts
 
 
-def vigenere_cryptanalysis(ciphertext, max_key_length=10):
+def vigenere_cryptanalysis(ciphertext, max_key_length=10, parallel=False, workers=None):
     """
     Полный криптоанализ шифра Виженера
 
     Параметры:
         ciphertext (str): Зашифрованный текст
         max_key_length (int): Максимальная длина ключа для перебора
+        parallel (bool): Перебирать длины ключа в пуле процессов
+        workers (int): Число процессов для параллельного перебора
 
     Возвращает:
         tuple: (найденный ключ, расшифрованный текст) или (None, ciphertext) при неудаче
     """
-    # Этап 1: Определение длины ключа методом Казиски
-    key_length = estimate_key_length(ciphertext)
+    # Индексный массив строится один раз: для поиска ключа и для дешифровки
+    indices = text_to_indices(ciphertext)
+    shifts = vigenere_find_key(indices, max_key_length, parallel, workers)
+    if shifts is None:
+        return None, ciphertext
 
-    # Если метод Казиски не дал результата или ключ слишком длинный
-    if key_length is None or key_length > max_key_length:
-        print("Метод Казиски не сработал, пробуем перебор...")
+    key = ''.join(RUS_ALPHABET[shift] for shift in shifts)
+    return key, apply_key_shifts(ciphertext, shifts, indices=indices)
 
-        # Перебираем возможные длины ключа от 2 до max_key_length
-        for possible_length in range(2, max_key_length + 1):
-            print(f"Проверяем длину ключа: {possible_length}")
 
-            # Пробуем дешифровать с текущей длиной ключа
-            key, decrypted = try_vigenere_decrypt(ciphertext, possible_length)
+class FrequencyAccumulator:
+    """
+    Накопитель частотной статистики для шифротекста, поступающего частями
+
+    Хранит только счетчики: количества букв, матрицу биграмм 33x33 и
+    количества букв по столбцам для всех длин ключа 1..max_key_length.
+    Каждая новая часть текста учитывается один раз (последний символ
+    предыдущей части запоминается, чтобы не потерять биграмму на стыке),
+    а гипотезы о ключах Цезаря и Виженера строятся по счетчикам,
+    без повторного просмотра всего текста
+    """
 
-            # Проверяем правдоподобность результата
-            if is_likely_correct(decrypted):
-                return key, decrypted
+    def __init__(self, max_key_length=20):
+        size = len(RUS_ALPHABET)
+        self.max_key_length = max_key_length
+        self.length = 0  # Сколько символов текста уже учтено
+        self.letters = np.zeros(size, dtype=np.int64)
+        self.bigrams = np.zeros((size, size), dtype=np.int64)
+        # columns[L - 1] - матрица (L, 33) количеств букв в столбцах при длине ключа L
+        self.columns = [np.zeros((length, size), dtype=np.int64)
+                        for length in range(1, max_key_length + 1)]
+        self.last_index = NON_LETTER
+
+    def update(self, chunk):
+        """Учет очередной части текста"""
+        indices = as_indices(chunk)
+        if len(indices) == 0:
+            return
+
+        self.letters += np.bincount(indices, minlength=NON_LETTER + 1)[:len(RUS_ALPHABET)]
+
+        # Биграмма на стыке: последний символ прошлой части + первый символ новой
+        joined = np.concatenate(([self.last_index], indices)).astype(np.uint8)
+        self.bigrams += ngram_counts(joined, 2).reshape(self.bigrams.shape)
+
+        for length in range(1, self.max_key_length + 1):
+            self.columns[length - 1] += column_counts(indices, length, self.length)
+
+        self.length += len(indices)
+        self.last_index = indices[-1]
+
+    def letter_frequencies(self):
+        """Словарь частот букв всего учтенного текста"""
+        return frequencies_from_counts(self.letters)
+
+    def bigram_frequencies(self, count=10):
+        """Самые частые биграммы всего учтенного текста"""
+        return top_bigrams(self.bigrams, count)
+
+    def index_of_coincidence(self):
+        """Индекс совпадений всего учтенного текста"""
+        return float(index_of_coincidence(self.letters))
+
+    def caesar_hypothesis(self):
+        """Ранжирование ключей Цезаря: [(ключ, хи-квадрат, уверенность), ...]"""
+        return rank_shifts_from_counts(self.letters)
+
+    def vigenere_hypothesis(self):
+        """
+        Гипотеза о ключе Виженера по накопленным счетчикам столбцов
+
+        Возвращает:
+            str: Предполагаемый ключ или None если длину определить не удалось
+        """
+        ics = np.array([index_of_coincidence(counts).mean() for counts in self.columns])
+        key_length = choose_key_length(ics)
+        if key_length is None:
+            return None
+        shifts = np.argmin(shift_chi_squared(self.columns[key_length - 1]), axis=1)
+        return ''.join(RUS_ALPHABET[shift] for shift in shifts)
+
+
+def accumulate_file(filename, chunk_size=INDEX_BLOCK_SIZE, max_key_length=20):
+    """Чтение файла частями в FrequencyAccumulator (весь файл в памяти не хранится)"""
+    accumulator = FrequencyAccumulator(max_key_length)
+    with open(filename, "r", encoding="utf-8") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            accumulator.update(chunk)
+    return accumulator
+
+
+# Начиная с этой максимальной длины ключа перебор длин выполняется параллельно
+PARALLEL_KEY_SEARCH_FROM = 20
+
+# Текст-образец для генерации тестовых шифротекстов (не входит в корпус
+# таблиц квадграмм - см. build_ngrams.py)
+SAMPLE_TEXT_FILE = os.path.join(MODULE_DIR, "caesar_test.txt")
+
+
+def make_vigenere_sample(size, key, seed=0):
+    """
+    Генерация шифротекста Виженера заданного размера для тестов
 
-        # Если ничего не нашли - возвращаем исходный текст
-        return None, ciphertext
+    Открытый текст - случайная последовательность слов из SAMPLE_TEXT_FILE
+    (чтобы не было периодичности простого повторения файла)
+    """
+    words = read_file(SAMPLE_TEXT_FILE).upper().split()
+    rng = random.Random(seed)
+    plaintext = " ".join(rng.choices(words, k=size // 6 + 1))[:size]
 
-    # Если длина ключа определена успешно
-    print(f"Предполагаемая длина ключа: {key_length}")
+    return apply_key_shifts(plaintext, [RUS_ALPHABET.index(ch) for ch in key], sign=1)
+
+
+def benchmark_key_length(size=1 << 20, key="ШИФРОВКА", max_key_length=20):
+    """
+    Сравнение методов определения длины ключа на шифротексте размера size
+
+    Возвращает:
+        dict: {метод: (время в секундах, найденная длина ключа)}
+    """
+    ciphertext = make_vigenere_sample(size, key)
+    methods = {
+        "Казиски (НОД, прежний)": lambda: estimate_key_length_gcd(ciphertext),
+        "Казиски (хэши)": lambda: estimate_key_length_kasiski(ciphertext, max_key_length),
+        "Индекс совпадений": lambda: estimate_key_length_ic(ciphertext, max_key_length),
+    }
+
+    print(f"\nШифротекст: {len(ciphertext)} символов, длина ключа {len(key)}")
+    results = {}
+    for name, method in methods.items():
+        start = time.perf_counter()
+        found = method()
+        elapsed = time.perf_counter() - start
+        results[name] = (elapsed, found)
+        print(f"{name}: {elapsed:.3f} сек, длина ключа = {found}")
+    return results
 
-    # Этап 2: Определение самого ключа и дешифровка
-    return try_vigenere_decrypt(ciphertext, key_length)
 
+# Каталог и форматы графиков частотного анализа
+REPORT_DIR = "reports"
 
-def analyze_text_stats(text, title):
+
+def analyze_text_stats(text, title, output_dir=None):
+    """
+    Частоты букв и биграмм текста с графиками
+
+    Графики сохраняются в output_dir; без дисплея - в REPORT_DIR,
+    чтобы результат не терялся. Имена файлов строятся из title
+    через slugify (заголовок вводит пользователь)
+    """
+    if output_dir is None and is_headless():
+        output_dir = REPORT_DIR
+    letters_output = bigrams_output = None
+    if output_dir is not None:
+        slug = slugify(title)
+        letters_output = os.path.join(output_dir, f"letters_{slug}")
+        bigrams_output = os.path.join(output_dir, f"bigrams_{slug}")
 
     print(f"\nАнализ текста: {title}")
 
@@ -472,13 +1582,15 @@ def analyze_text_stats(text, title):
     # Визуализация частот букв
     plot_frequencies(
         dict(sorted(letter_freq.items(), key=lambda x: -x[1])[:10]),
-        f"Частоты букв ({title})"
+        f"Частоты букв ({title})",
+        letters_output, REPORT_FORMATS
     )
 
     # Визуализация частот биграмм
     plot_frequencies(
         dict(bigrams),
-        f"Частоты биграмм ({title})"
+        f"Частоты биграмм ({title})",
+        bigrams_output, REPORT_FORMATS
     )
 
 
@@ -487,6 +1599,21 @@ def handle_caesar():
     # Запрашиваем имя файла у пользователя
     filename = input("Введите имя файла с зашифрованным текстом: ")
 
+    # Большой файл анализируется по индексному массиву без загрузки текста
+    if is_large_file(filename):
+        print("\nАнализ большого файла...")
+        key, ranking = caesar_find_key(read_indices(filename))
+        print(f"\nКлюч: {key}")
+        print("\nЛучшие варианты ключа (ключ: хи-квадрат, уверенность):")
+        for candidate, chi2, confidence in ranking[:3]:
+            print(f"{candidate}: {chi2:.1f}, {confidence:.2%}")
+        output = f"decrypted_caesar_key{key}.txt"
+        preview = decrypt_file(filename, output, [key])
+        print("\nПервые 200 символов расшифровки:")
+        print(preview)
+        print(f"Результат сохранен в {output}")
+        return
+
     # Читаем файл
     ciphertext = read_file(filename)
     if ciphertext is None:
@@ -498,10 +1625,13 @@ def handle_caesar():
 
     print("\nАнализ...")
     # Выполняем криптоанализ
-    key, decrypted = caesar_cryptanalysis(ciphertext)
+    key, decrypted, ranking = caesar_cryptanalysis(ciphertext, return_ranking=True)
 
     # Выводим результаты
     print(f"\nКлюч: {key}")
+    print("\nЛучшие варианты ключа (ключ: хи-квадрат, уверенность):")
+    for candidate, chi2, confidence in ranking[:3]:
+        print(f"{candidate}: {chi2:.1f}, {confidence:.2%}")
     print("\nПервые 200 символов расшифровки:")
     print(decrypted[:200])
 
@@ -511,23 +1641,61 @@ def handle_caesar():
         print("Результат сохранен")
 
 
+def ask_max_key_length(default=10):
+    """Запрос максимальной длины ключа (Enter - default); повтор, пока не введено число от 1"""
+    while True:
+        value = input(f"Максимальная длина ключа (Enter - {default}): ").strip()
+        if not value:
+            return default
+        if value.isdigit() and int(value) >= 1:
+            return int(value)
+        print("Ошибка: введите целое число не меньше 1")
+
+
 def handle_vigenere():
     """Обработчик для анализа шифра Виженера"""
     # Запрашиваем имя файла у пользователя
     filename = input("Введите имя файла с зашифрованным текстом: ")
 
+    # Большой файл анализируется по индексному массиву без загрузки текста
+    if is_large_file(filename):
+        max_key_length = ask_max_key_length()
+
+        print("\nАнализ большого файла...")
+        shifts = vigenere_find_key(
+            read_indices(filename), max_key_length, parallel=max_key_length > PARALLEL_KEY_SEARCH_FROM
+        )
+        if shifts is None:
+            print("Не удалось определить ключ")
+            return
+
+        key = ''.join(RUS_ALPHABET[shift] for shift in shifts)
+        print(f"\nКлюч: {key}")
+        output = f"decrypted_vigenere_key{key}.txt"
+        preview = decrypt_file(filename, output, shifts)
+        print("\nПервые 200 символов расшифровки:")
+        print(preview)
+        print(f"Результат сохранен в {output}")
+        return
+
     # Читаем файл
     ciphertext = read_file(filename)
     if ciphertext is None:
         return  # Выходим если файл не прочитан
 
     # Предупреждаем если текст слишком короткий
-    if len(ciphertext) < 2000:
-        print("Рекомендуется текст от 2000 символов для точного анализа")
+    # (ключ уточняется по модели квадграмм, поэтому хватает более коротких текстов)
+    if len(ciphertext) < MIN_VIGENERE_TEXT_LENGTH:
+        print(f"Рекомендуется текст от {MIN_VIGENERE_TEXT_LENGTH} символов для точного анализа")
+
+    # Запрашиваем максимальную длину ключа: длинные ключи перебираются параллельно
+    max_key_length = ask_max_key_length()
 
     print("\nАнализ...")
     # Выполняем криптоанализ
-    key, decrypted = vigenere_cryptanalysis(ciphertext)
+    key, decrypted = vigenere_cryptanalysis(
+        ciphertext, max_key_length, parallel=max_key_length > PARALLEL_KEY_SEARCH_FROM
+    )
 
     # Выводим результаты если ключ найден
     if key:
@@ -570,7 +1738,8 @@ def main_menu():
         print("1. Анализ Цезаря")
         print("2. Анализ Виженера")
         print("3. Частотный анализ")
-        print("4. Выход")
+        print("4. Сравнение методов определения длины ключа")
+        print("5. Выход")
 
 
         choice = input("Выберите действие: ").strip()
@@ -583,6 +1752,8 @@ def main_menu():
         elif choice == "3":
             handle_frequency_analysis()
         elif choice == "4":
+            benchmark_key_length()
+        elif choice == "5":
             print("Завершение работы")
             break  # Выход из цикла
         else:
@@ -1,56 +1,37 @@
-import random
 import csv
-from time import perf_counter
-from sympy import isprime, primitive_root
-import matplotlib.pyplot as plt
+import argparse
 import os
 
-# --- Быстрая генерация ключей ---
-def generate_keys(bits=256):
-    attempts = 0
-    while True:
-        attempts += 1
-        candidate = random.getrandbits(bits) | 1  # нечётное число
-        if isprime(candidate):
-            try:
-                g = primitive_root(candidate)
-                p = candidate
-                break
-            except ValueError:
-                continue
-    x = random.randint(2, p - 2)
-    y = pow(g, x, p)
-    return (p, g, y), x, attempts
-
-# --- Шифрование ---
-def encrypt(message, public_key):
-    p, g, y = public_key
-    k = random.randint(2, p - 2)
-    a = pow(g, k, p)
-    s = pow(y, k, p)
-    return [(a, (ord(char) * s) % p) for char in message]
-
-# --- Расшифровка ---
-def decrypt(cipher, private_key, p):
-    result = ''
-    for a, b in cipher:
-        s = pow(a, private_key, p)
-        s_inv = pow(s, -1, p)
-        result += chr((b * s_inv) % p)
-    return result
-
-# --- Эксперимент ---
-# --- Эксперимент ---
-def run_experiment(bits_list, plaintext, repeats=3, csv_path='elgamal_timings.csv'):
+# generate_keys, encrypt и decrypt - прежний API модуля (from ElGamal import encrypt)
+from elgamal_experiment import decrypt, encrypt, generate_keys, pool_key, run_job
+from keypool import KEY_POOL_FILE, KeyPool
+from parallel_jobs import report_speedup, run_jobs, serial_time
+from primes import DEFAULT_GROUP_METHOD, GROUP_METHODS, compare_prime_methods, generate_group
+from reporting import REPORT_FORMATS, finish_figure, get_pyplot
+
+# workers - число процессов (None - по числу ядер, 1 - последовательно);
+# задачи (bits, repeat) запускаются от самых длинных ключей к коротким,
+# а печатаются и сохраняются в прежнем порядке;
+# baseline - замерить для ускорения и последовательный запуск (workers=1),
+# иначе ускорение - оценка по сумме времени задач;
+# pool - пул готовых ключей (keypool.KeyPool): ключи задач берутся из него
+# в этом процессе, и задачи их не генерируют
+def run_experiment(bits_list, plaintext, repeats=3, csv_path='elgamal_timings.csv', method=DEFAULT_GROUP_METHOD, block=True,
+                   workers=None, seed=0, baseline=False, pool=None):
     encrypt_times = []
     decrypt_times = []
     keygen_times = []
     avg_attempts_list = []
 
     os.makedirs("results", exist_ok=True)
+    jobs = [(bits, i, plaintext, method, block, seed, pool_key(bits, method, pool) if pool else None)
+            for bits in sorted(set(bits_list), reverse=True) for i in range(repeats)]
+    results, elapsed, workers = run_jobs(run_job, jobs, workers)
+    results = {(job[0], job[1]): result for job, result in zip(jobs, results)}
+
     with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(["Bits", "AvgKeyGenTime", "AvgEncryptTime", "AvgDecryptTime", "AvgAttempts"])
+        writer.writerow(["Bits", "AvgKeyGenTime", "AvgEncryptTime", "AvgDecryptTime", "AvgAttempts", "Method"])
 
         for bits in bits_list:
             print(f"\n=== Тест для {bits} бит ===")
@@ -61,23 +42,22 @@ def run_experiment(bits_list, plaintext, repeats=3, csv_path='elgamal_timings.cs
 
             for i in range(repeats):
                 print(f"  Повтор {i + 1}/{repeats}...")
+                result = results[bits, i]
+                public_key, private_key = result["public_key"], result["private_key"]
+                attempts, cipher, decrypted = result["attempts"], result["cipher"], result["decrypted"]
 
-                start_key = perf_counter()
-                public_key, private_key, attempts = generate_keys(bits)
-                key_time = perf_counter() - start_key
+                key_time = result["key_time"]
                 key_time_sum += key_time
                 all_attempts.append(attempts)
                 print(f"    Генерация ключей: {key_time:.4f} сек (попыток: {attempts})")
 
-                start_encrypt = perf_counter()
-                cipher = encrypt(plaintext, public_key)
-                encrypt_time = perf_counter() - start_encrypt
+                encrypt_time = result["encrypt_time"]
                 enc_time_sum += encrypt_time
                 print(f"    Шифрование: {encrypt_time:.6f} сек")
+                size = len(cipher) if block else len(str(cipher).encode('utf-8'))
+                print(f"    Размер шифротекста: {size} байт")
 
-                start_decrypt = perf_counter()
-                decrypted = decrypt(cipher, private_key, public_key[0])
-                decrypt_time = perf_counter() - start_decrypt
+                decrypt_time = result["decrypt_time"]
                 dec_time_sum += decrypt_time
                 print(f"    Расшифровка: {decrypt_time:.4f} сек")
 
@@ -94,8 +74,12 @@ def run_experiment(bits_list, plaintext, repeats=3, csv_path='elgamal_timings.cs
                         f.write(f"Private key (x):\n{private_key}\n")
                         f.write(f"Attempts to generate key: {attempts}\n")
 
-                    with open(f"results/cipher_{bits}.txt", "w", encoding='utf-8') as f:
-                        f.write(str(cipher))
+                    if block:
+                        with open(f"results/cipher_{bits}.bin", "wb") as f:
+                            f.write(cipher)
+                    else:
+                        with open(f"results/cipher_{bits}.txt", "w", encoding='utf-8') as f:
+                            f.write(str(cipher))
 
                     with open(f"results/decrypted_{bits}.txt", "w", encoding='utf-8') as f:
                         f.write(decrypted)
@@ -110,14 +94,24 @@ def run_experiment(bits_list, plaintext, repeats=3, csv_path='elgamal_timings.cs
             decrypt_times.append(avg_dec)
             avg_attempts_list.append(avg_attempts)
 
-            writer.writerow([bits, avg_key, avg_enc, avg_dec, avg_attempts])
+            writer.writerow([bits, avg_key, avg_enc, avg_dec, avg_attempts, method])
             csvfile.flush()  # На всякий случай сразу записываем
 
+    serial, estimate = serial_time(run_job, jobs, elapsed, workers,
+                                   [result["job_time"] for result in results.values()], baseline)
+    report_speedup(elapsed, serial, workers, estimate)
+
     return bits_list, keygen_times, encrypt_times, decrypt_times, avg_attempts_list
 
 
 # --- Основной запуск ---
 if __name__ == '__main__':
+    # Пул ключей - по желанию: python ElGamal.py --key-pool [файл]
+    parser = argparse.ArgumentParser(description="Эксперимент ElGamal")
+    parser.add_argument("--key-pool", nargs="?", const=KEY_POOL_FILE, default=None, metavar="FILE",
+                        help=f"брать ключи из пула keypool.py (по умолчанию {KEY_POOL_FILE})")
+    args = parser.parse_args()
+
     try:
         with open('original.txt', 'r', encoding='utf-8') as f:
             plaintext = f.read()
@@ -128,10 +122,17 @@ if __name__ == '__main__':
     plaintext = plaintext[:100]
 
     bits_list = [64,128,192, 256]
-    bits, key_times, enc_times, dec_times, avg_attempts = run_experiment(bits_list, plaintext, repeats=3)
+    if args.key_pool:
+        with KeyPool(bits_list, path=args.key_pool) as pool:
+            bits, key_times, enc_times, dec_times, avg_attempts = run_experiment(bits_list, plaintext, repeats=3,
+                                                                                 pool=pool)
+    else:
+        bits, key_times, enc_times, dec_times, avg_attempts = run_experiment(bits_list, plaintext, repeats=3)
+
+    plt = get_pyplot()
 
     # --- График времени ---
-    plt.figure(figsize=(10, 6))
+    figure = plt.figure(figsize=(10, 6))
     plt.plot(bits, key_times, marker='o', label="Генерация ключей")
     plt.plot(bits, enc_times, marker='s', label="Шифрование")
     plt.plot(bits, dec_times, marker='^', label="Расшифровка")
@@ -143,11 +144,12 @@ if __name__ == '__main__':
     plt.legend()
     plt.grid(True, which='both', linestyle='--', linewidth=0.5)
     plt.tight_layout()
-    plt.savefig("results/timings_plot.png")
-    plt.show()
+    finish_figure(figure, "results/timings_plot", REPORT_FORMATS, data={
+        "bits": bits, "keygen": key_times, "encrypt": enc_times, "decrypt": dec_times,
+    })
 
     # --- График попыток ---
-    plt.figure(figsize=(8, 5))
+    figure = plt.figure(figsize=(8, 5))
     plt.plot(bits, avg_attempts, marker='d', color='orange')
     plt.xlabel("Длина ключа (бит)")
     plt.ylabel("Среднее число попыток")
@@ -155,5 +157,17 @@ if __name__ == '__main__':
     plt.grid(True, linestyle='--', linewidth=0.5)
     plt.xticks(bits, [str(b) for b in bits])
     plt.tight_layout()
-    plt.savefig("results/attempts_plot.png")
-    plt.show()
+    finish_figure(figure, "results/attempts_plot", REPORT_FORMATS,
+                  data={"bits": bits, "attempts": avg_attempts})
+
+    # --- Сравнение способов поиска простого числа ---
+    # Замеряется только поиск простого и группы: generate_keys еще ищет
+    # первообразный корень (sympy.primitive_root раскладывает p - 1), и на 256
+    # битах один такой ключ может строиться минуты
+    print("\n=== Поиск простого: перебор (random), решето (sieve); группы: safe, schnorr ===")
+    comparison = compare_prime_methods(bits_list, repeats=3)
+    comparison += compare_prime_methods(bits_list, repeats=3, generate=generate_group, methods=GROUP_METHODS)
+    with open("results/keygen_methods.csv", "w", newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(["Bits", "Method", "AvgKeyGenTime", "AvgAttempts"])
+        writer.writerows(comparison)
@@ -0,0 +1,321 @@
+"""
+Набор бенчмарков для классических шифров (4.py) и их криптоанализа (6.py)
+
+Измеряется:
+    - пропускная способность (МБ/с) caesar_encrypt, vigenere_encrypt,
+      vigenere_decrypt из 4.py и caesar_decrypt из 6.py на синтетических
+      русских и английских текстах от 1 КБ до 100 МБ;
+    - время и доля верно найденных ключей caesar_cryptanalysis
+      и vigenere_cryptanalysis в зависимости от длины текста.
+
+Тексты генерируются детерминированно (по seed), результаты дописываются
+в CSV вместе с хэшем текущего коммита - так можно сравнивать коммиты:
+
+    python benchmark.py --sizes 1K 1M 100M --csv benchmark_results.csv
+"""
+
+import argparse
+import contextlib
+import csv
+import importlib
+import io
+import os
+import random
+import subprocess
+from datetime import datetime
+from time import perf_counter
+
+import numpy as np
+
+ciphers = importlib.import_module("4")
+analysis = importlib.import_module("6")
+
+# Размеры текстов (в байтах UTF-8) для замера скорости шифрования
+THROUGHPUT_SIZES = ["1K", "10K", "100K", "1M", "10M", "100M"]
+
+# Длины текстов (в символах) и число случайных ключей для криптоанализа
+ANALYSIS_LENGTHS = [100, 300, 1000, 3000, 10000]
+ANALYSIS_TRIALS = 20
+
+# Длины ключей Виженера в испытаниях криптоанализа
+VIGENERE_KEY_LENGTHS = (3, 8)
+
+# Ключи для замера скорости шифрования
+CAESAR_KEY = 3
+VIGENERE_KEY = {"ru": "ШИФРОВКА", "en": "CIPHER"}
+
+# Файл с образцом русского текста: из его слов собираются тексты
+SAMPLE_TEXT_FILE = analysis.SAMPLE_TEXT_FILE
+
+DEFAULT_CSV = "benchmark_results.csv"
+
+CSV_FIELDS = [
+    "commit", "timestamp", "benchmark", "function", "lang", "size_bytes", "chars",
+    "seconds", "mb_per_s", "trials", "recovered", "recovery_rate",
+]
+
+_UNITS = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+
+
+def parse_size(value):
+    """Размер вида 1K, 10M, 4096 -> число байт"""
+    value = value.strip().upper().rstrip("B")
+    if value and value[-1] in _UNITS:
+        return int(float(value[:-1]) * _UNITS[value[-1]])
+    return int(value)
+
+
+def current_commit():
+    """Короткий хэш текущего коммита (с пометкой -dirty при незакоммиченных правках)"""
+    root = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=root,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"], cwd=root,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return commit + ("-dirty" if dirty else "")
+
+
+def _frequency_words(lang, rng, count=5000):
+    """Словарь из случайных «слов» с эталонными частотами букв языка"""
+    alphabet, freq = analysis.LANGUAGES[lang]
+    letters = np.array(list(alphabet))
+    weights = np.array([freq[letter] for letter in alphabet])
+    weights /= weights.sum()
+    lengths = rng.integers(1, 10, size=count)
+    flat = rng.choice(letters, size=int(lengths.sum()), p=weights)
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    return ["".join(flat[bounds[i]:bounds[i + 1]]) for i in range(count)]
+
+
+class HeldOutError(ValueError):
+    """Текст-образец входит в корпус таблицы квадграмм (см. check_held_out)"""
+
+
+def check_held_out(text, lang):
+    """
+    Проверка, что текст не входит в корпус таблицы квадграмм языка
+
+    Иначе доля найденных ключей измерялась бы на обучающих данных модели
+    и была бы завышена - в этом случае выбрасывается HeldOutError
+    (main останавливает по нему бенчмарк)
+    """
+    overlap = analysis.get_ngram_model(lang).corpus_overlap(text)
+    if overlap:
+        raise HeldOutError(
+            f"{overlap:.0%} предложений текста-образца есть в корпусе таблицы квадграмм "
+            f"{analysis.NGRAM_FILES[lang]}: возьмите другой образец или пересоберите таблицу"
+        )
+
+
+def vocabulary(lang, seed=0):
+    """
+    Слова для синтетических текстов
+
+    Для русского - слова SAMPLE_TEXT_FILE (сохраняются биграммы и квадграммы
+    настоящего текста; образец должен быть вне корпуса таблицы квадграмм -
+    см. check_held_out), при его отсутствии и для английского - случайные
+    слова с эталонными частотами букв
+    """
+    if lang == "ru" and os.path.exists(SAMPLE_TEXT_FILE):
+        with open(SAMPLE_TEXT_FILE, "r", encoding="utf-8") as f:
+            text = f.read()
+        check_held_out(text, lang)
+        words = text.split()
+        if words:
+            return words
+    return _frequency_words(lang, np.random.default_rng(seed))
+
+
+def synthetic_text(size, lang="ru", seed=0):
+    """
+    Детерминированный текст размером около size байт UTF-8
+
+    Случайная последовательность слов словаря через пробел (без
+    периодичности простого повторения файла); текст обрезается так,
+    чтобы не превысить size байт
+    """
+    words = vocabulary(lang, seed)
+    rng = np.random.default_rng(seed)
+    average = sum(len(word.encode("utf-8")) + 1 for word in words) / len(words)
+    choice = rng.integers(0, len(words), size=int(size / average) + 16)
+    text = " ".join(words[i] for i in choice)
+    return text.encode("utf-8")[:size].decode("utf-8", "ignore")
+
+
+def best_time(function, repeats):
+    """Наименьшее время из repeats запусков function"""
+    best = None
+    for _ in range(repeats):
+        start = perf_counter()
+        function()
+        elapsed = perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def throughput_cases(lang):
+    """Замеряемые функции для языка: имя -> функция от текста"""
+    alphabet = analysis.LANGUAGES[lang][0]
+    key = VIGENERE_KEY[lang]
+    cases = {
+        "4.caesar_encrypt": lambda text: ciphers.caesar_encrypt(text, CAESAR_KEY),
+        "4.vigenere_encrypt": lambda text: ciphers.vigenere_encrypt(text, key, alphabet),
+        "4.vigenere_decrypt": lambda text: ciphers.vigenere_decrypt(text, key, alphabet),
+    }
+    # 6.py работает только с русским алфавитом
+    if lang == "ru":
+        cases["6.caesar_decrypt"] = lambda text: analysis.caesar_decrypt(text, CAESAR_KEY)
+    return cases
+
+
+def benchmark_throughput(sizes, langs=("ru", "en"), repeats=3, seed=0):
+    """
+    Скорость шифрования и дешифрования (МБ/с) по размерам текста
+
+    Возвращает:
+        list: строки результатов (словари с полями CSV_FIELDS)
+    """
+    rows = []
+    for lang in langs:
+        for size in sizes:
+            text = synthetic_text(size, lang, seed)
+            size_bytes = len(text.encode("utf-8"))
+            # Большие тексты замеряются один раз, иначе бенчмарк идет слишком долго
+            runs = repeats if size_bytes < (16 << 20) else 1
+            for name, function in throughput_cases(lang).items():
+                elapsed = best_time(lambda: function(text), runs)
+                speed = size_bytes / (1 << 20) / elapsed if elapsed > 0 else float("inf")
+                print(f"{name:22} {lang} {size_bytes:>11} байт: {elapsed:.4f} сек, {speed:.1f} МБ/с")
+                rows.append({
+                    "benchmark": "throughput", "function": name, "lang": lang,
+                    "size_bytes": size_bytes, "chars": len(text),
+                    "seconds": elapsed, "mb_per_s": speed,
+                })
+    return rows
+
+
+def _run_quietly(function, *args, **kwargs):
+    """Запуск функции криптоанализа без ее промежуточного вывода"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        return function(*args, **kwargs)
+
+
+def benchmark_cryptanalysis(lengths, trials=ANALYSIS_TRIALS, seed=0):
+    """
+    Время и доля верно найденных ключей криптоанализа по длине текста
+
+    Для каждой длины берется trials фрагментов синтетического русского
+    текста и случайных ключей (Цезарь - сдвиг, Виженер - ключи длины
+    VIGENERE_KEY_LENGTHS). Ключ Виженера считается найденным, если
+    расшифровка совпала с открытым текстом
+
+    Возвращает:
+        list: строки результатов (словари с полями CSV_FIELDS)
+    """
+    rng = random.Random(seed)
+    source = synthetic_text(max(lengths) * trials * 2 + 1024, "ru", seed)
+    alphabet = analysis.RUS_ALPHABET
+    rows = []
+
+    def add_row(name, length, size_bytes, elapsed, recovered):
+        rate = recovered / trials
+        print(f"{name:32} {length:>6} симв.: {elapsed / trials:.4f} сек/текст, "
+              f"найдено {recovered}/{trials} ({rate:.0%})")
+        rows.append({
+            "benchmark": "cryptanalysis", "function": name, "lang": "ru",
+            "size_bytes": size_bytes, "chars": length, "seconds": elapsed / trials,
+            "trials": trials, "recovered": recovered, "recovery_rate": rate,
+        })
+
+    for length in lengths:
+        starts = [rng.randrange(len(source) - length) for _ in range(trials)]
+        plaintexts = [source[start:start + length] for start in starts]
+        size_bytes = sum(len(plaintext.encode("utf-8")) for plaintext in plaintexts) // trials
+
+        # Шифр Цезаря
+        keys = [rng.randrange(1, len(alphabet)) for _ in range(trials)]
+        elapsed, recovered = 0.0, 0
+        for plaintext, key in zip(plaintexts, keys):
+            ciphertext = analysis.apply_key_shifts(plaintext, [key], sign=1)
+            start = perf_counter()
+            found, _ = _run_quietly(analysis.caesar_cryptanalysis, ciphertext)
+            elapsed += perf_counter() - start
+            recovered += found == key
+        add_row("6.caesar_cryptanalysis", length, size_bytes, elapsed, recovered)
+
+        # Шифр Виженера
+        for key_length in VIGENERE_KEY_LENGTHS:
+            elapsed, recovered = 0.0, 0
+            for plaintext in plaintexts:
+                shifts = [rng.randrange(len(alphabet)) for _ in range(key_length)]
+                ciphertext = analysis.apply_key_shifts(plaintext, shifts, sign=1)
+                start = perf_counter()
+                _, decrypted = _run_quietly(analysis.vigenere_cryptanalysis, ciphertext)
+                elapsed += perf_counter() - start
+                recovered += decrypted == plaintext
+            add_row(f"6.vigenere_cryptanalysis(L={key_length})", length, size_bytes, elapsed, recovered)
+
+    return rows
+
+
+def write_results(filename, rows):
+    """Дописывание результатов в CSV (заголовок - только в новый файл)"""
+    commit = current_commit()
+    timestamp = datetime.now().isoformat(timespec="seconds")
+    is_new = not os.path.exists(filename) or os.path.getsize(filename) == 0
+    with open(filename, "a", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=CSV_FIELDS)
+        if is_new:
+            writer.writeheader()
+        for row in rows:
+            writer.writerow({"commit": commit, "timestamp": timestamp, **row})
+    print(f"\nРезультаты ({len(rows)} строк, коммит {commit}) записаны в {filename}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Бенчмарк шифров Цезаря/Виженера и их криптоанализа"
+    )
+    parser.add_argument("--sizes", nargs="+", default=THROUGHPUT_SIZES,
+                        help="размеры текстов для замера скорости (1K, 10M, ...)")
+    parser.add_argument("--langs", nargs="+", choices=sorted(analysis.LANGUAGES),
+                        default=["ru", "en"], help="языки синтетических текстов")
+    parser.add_argument("--lengths", nargs="+", type=int, default=ANALYSIS_LENGTHS,
+                        help="длины текстов (в символах) для криптоанализа")
+    parser.add_argument("--trials", type=int, default=ANALYSIS_TRIALS,
+                        help="число случайных ключей на каждую длину")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="повторы замера скорости (берется лучшее время)")
+    parser.add_argument("--seed", type=int, default=0, help="seed генерации текстов и ключей")
+    parser.add_argument("--skip-throughput", action="store_true",
+                        help="не замерять скорость шифрования")
+    parser.add_argument("--skip-analysis", action="store_true",
+                        help="не замерять криптоанализ")
+    parser.add_argument("--csv", default=DEFAULT_CSV, help="файл результатов")
+    args = parser.parse_args(argv)
+
+    rows = []
+    try:
+        if not args.skip_throughput:
+            print("=== Скорость шифрования ===")
+            sizes = [parse_size(size) for size in args.sizes]
+            rows += benchmark_throughput(sizes, args.langs, args.repeats, args.seed)
+        if not args.skip_analysis:
+            print("\n=== Криптоанализ ===")
+            rows += benchmark_cryptanalysis(args.lengths, args.trials, args.seed)
+    except HeldOutError as error:
+        # Образец из корпуса таблицы квадграмм - бенчмарк останавливается с сообщением
+        raise SystemExit(str(error)) from None
+    if rows:
+        write_results(args.csv, rows)
+
+
+if __name__ == "__main__":
+    main()
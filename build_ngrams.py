@@ -0,0 +1,133 @@
+"""
+Построение таблиц квадграмм ngrams_ru.npz и ngrams_en.npz для 6.py
+
+Таблицы строятся один раз заранее и хранятся в репозитории. Корпуса не должны
+пересекаться с образцами и тестовыми текстами (caesar_test.txt, Vinzher_test.txt,
+en_*.txt), иначе точность криптоанализа, измеренная на них, будет завышена -
+поэтому тексты репозитория в корпус не берутся, а после построения
+проверяется, что ни одно их предложение в корпус не попало.
+
+Источники по умолчанию (есть в любом Debian/Ubuntu с пакетами локализации):
+    - ru: переводы сообщений программ (/usr/share/locale/ru/LC_MESSAGES/*.mo,
+      кроме справочников iso_*, и перевод vim), русские man-страницы
+      (/usr/share/man/ru) и русский учебник vim (vimtutor);
+    - en: английские man-страницы (/usr/share/man/man[1-8]) и тексты лицензий
+      (/usr/share/common-licenses).
+
+    python build_ngrams.py                # обе таблицы из источников по умолчанию
+    python build_ngrams.py --lang ru --files corpus1.txt corpus2.txt
+"""
+
+import argparse
+import glob
+import gzip
+import importlib
+import os
+import re
+import struct
+
+analysis = importlib.import_module("6")
+
+# Тексты репозитория, которые не должны попасть в корпус
+REPOSITORY_TEXTS = ["caesar_test.txt", "Vinzher_test.txt", "en_Cesar.txt", "en_Vishner.txt"]
+
+DEFAULT_SOURCES = {
+    "ru": [
+        "/usr/share/locale/ru/LC_MESSAGES/*.mo", "/usr/share/vim/vim*/lang/ru/LC_MESSAGES/*.mo",
+        "/usr/share/man/ru/man*/*", "/usr/share/vim/vim*/tutor/tutor.ru.utf-8",
+    ],
+    "en": ["/usr/share/man/man[1-8]/*", "/usr/share/common-licenses/*"],
+}
+
+# Справочники названий (языки, страны, валюты) - списки, а не связный текст
+EXCLUDED_SOURCES = re.compile(r"/iso_[^/]*\.mo$")
+
+# Команды и escape-последовательности troff в man-страницах
+_ROFF_ESCAPES = re.compile(r"\\(\(..|\[[^\]]*\]|f.|s[-+]?\d|[*n]\(?..|.)")
+
+
+def read_mo(filename):
+    """Переводы (msgstr) из скомпилированного каталога gettext .mo"""
+    with open(filename, "rb") as f:
+        data = f.read()
+    magic = struct.unpack_from("<I", data)[0]
+    order = "<" if magic == 0x950412DE else ">"
+    count, _, translations = struct.unpack_from(order + "III", data, 8)
+    texts = []
+    for i in range(count):
+        length, offset = struct.unpack_from(order + "II", data, translations + 8 * i)
+        # Заголовок каталога (перевод пустой строки) - служебные поля
+        text = data[offset:offset + length].decode("utf-8", "ignore")
+        if i and text:
+            texts.extend(text.split("\0"))  # Формы множественного числа
+    return "\n".join(texts)
+
+
+def read_man(filename):
+    """Текст man-страницы без команд и escape-последовательностей troff"""
+    opener = gzip.open if filename.endswith(".gz") else open
+    with opener(filename, "rt", encoding="utf-8", errors="ignore") as f:
+        lines = f.read().splitlines()
+    text = [_ROFF_ESCAPES.sub("", line) for line in lines if not line.startswith((".", "'"))]
+    return "\n".join(text)
+
+
+def read_source(filename):
+    """Текст файла корпуса в зависимости от его типа"""
+    if filename.endswith(".mo"):
+        return read_mo(filename)
+    if "/man/" in filename:
+        return read_man(filename)
+    with open(filename, "r", encoding="utf-8", errors="ignore") as f:
+        return f.read()
+
+
+def source_files(patterns):
+    """Файлы корпуса по шаблонам (без справочников и каталогов)"""
+    files = []
+    for pattern in patterns:
+        files += sorted(
+            name for name in glob.glob(pattern)
+            if os.path.isfile(name) and not EXCLUDED_SOURCES.search(name)
+        )
+    return files
+
+
+def build(lang, files, output=None):
+    """Построение таблицы языка и проверка, что тексты репозитория не в корпусе"""
+    texts = [read_source(name) for name in files]
+    model = analysis.build_ngram_model(lang, [text for text in texts if text])
+    for name in REPOSITORY_TEXTS:
+        path = os.path.join(analysis.MODULE_DIR, name)
+        if os.path.exists(path):
+            overlap = model.corpus_overlap(analysis.read_file(path))
+            if overlap:
+                raise SystemExit(f"{name}: {overlap:.0%} предложений найдено в корпусе {lang}")
+    output = output or analysis.NGRAM_FILES[lang]
+    analysis.save_ngram_model(model, output)
+
+    letters = sum(int((analysis.text_to_indices(text, lang) != analysis.NON_LETTER).sum())
+                  for text in texts)
+    print(f"{lang}: {len(files)} файлов, {letters} букв, вес частот корпуса {model.weight}, "
+          f"оценка текста {model.text_score:.3f}, случайных букв {model.random_score:.3f} -> {output}")
+    return model
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Построение таблиц квадграмм для 6.py")
+    parser.add_argument("--lang", nargs="+", choices=sorted(DEFAULT_SOURCES),
+                        default=sorted(DEFAULT_SOURCES), help="языки таблиц")
+    parser.add_argument("--files", nargs="+", help="файлы корпуса (вместо источников по умолчанию)")
+    args = parser.parse_args(argv)
+    if args.files and len(args.lang) != 1:
+        parser.error("--files задается для одного языка (--lang)")
+
+    for lang in args.lang:
+        files = args.files or source_files(DEFAULT_SOURCES[lang])
+        if not files:
+            parser.error(f"нет файлов корпуса для {lang}")
+        build(lang, files)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Общий кодек алфавитов для шифров Цезаря и Виженера (4.py) и криптоанализа (6.py)
+
+Для любого алфавита (в том числе перемешанного) один раз строятся:
+    - словарь символ -> (индекс буквы, строчная ли буква) для посимвольной работы;
+    - таблицы замены для str.translate (сдвиг всего текста за один вызов);
+    - таблицы поиска NumPy: код символа -> индекс буквы / регистр, индекс -> код
+      буквы - для перевода целого текста в индексы и обратно одним действием.
+Алфавиты кэшируются (get_alphabet), поэтому таблицы не пересчитываются
+при каждом вызове шифра
+"""
+
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:  # Без NumPy доступна только посимвольная работа и str.translate
+    np = None
+
+# Метка не-буквы в индексном массиве (индексы букв - от 0 до size - 1)
+NON_LETTER = 255
+
+
+class Alphabet:
+    """
+    Алфавит шифра с таблицами для быстрого кодирования
+
+    Регистр букв сохраняется: индекс буквы не зависит от регистра, а при
+    обратном переводе буква берется из алфавита того же регистра
+    """
+
+    def __init__(self, letters):
+        self.upper = letters.upper()
+        self.lower = letters.lower()
+        self.size = len(self.upper)
+        if self.size >= NON_LETTER:
+            raise ValueError(f"Алфавит должен быть короче {NON_LETTER} символов")
+
+        # Символ -> (индекс буквы, строчная ли буква)
+        self.positions = {ch: (index, True) for index, ch in enumerate(self.lower)}
+        self.positions.update({ch: (index, False) for index, ch in enumerate(self.upper)})
+        self._arrays = None
+
+    def __contains__(self, ch):
+        return ch in self.positions
+
+    def key_shifts(self, key):
+        """Сдвиги для символов ключа (индексы в алфавите без учета регистра)"""
+        try:
+            return [self.positions[ch][0] for ch in key]
+        except KeyError as e:
+            raise ValueError(f"Символ ключа {e} отсутствует в алфавите") from None
+
+    def fill_translation(self, table, shift):
+        """Запись в таблицу str.translate замен букв алфавита со сдвигом shift"""
+        for ch, (index, is_lower) in self.positions.items():
+            letters = self.lower if is_lower else self.upper
+            table[ord(ch)] = letters[(index + shift) % self.size]
+        return table
+
+    def translation(self, shift):
+        """
+        Таблица замены для str.translate: каждая буква сдвигается на shift
+
+        Таблица - список, индексируемый кодом символа: поиск по списку
+        быстрее поиска по словарю, а символы с кодом за пределами списка
+        str.translate оставляет без изменений
+        """
+        return translation_table((self,), shift)
+
+    def arrays(self):
+        """
+        Таблицы NumPy (строятся один раз)
+
+        Возвращает:
+            tuple: (код символа -> индекс буквы или NON_LETTER,
+                    код символа -> строчная ли буква,
+                    индекс -> код заглавной буквы, индекс -> код строчной буквы)
+        """
+        if self._arrays is None:
+            upper_codes = np.array([ord(ch) for ch in self.upper], dtype=np.uint32)
+            lower_codes = np.array([ord(ch) for ch in self.lower], dtype=np.uint32)
+
+            # Последний элемент таблиц - для всех кодов за их пределами (не-буквы)
+            lut_size = int(max(upper_codes.max(), lower_codes.max())) + 2
+            index_lut = np.full(lut_size, NON_LETTER, dtype=np.uint8)
+            index_lut[lower_codes] = np.arange(self.size)
+            index_lut[upper_codes] = np.arange(self.size)
+            is_lower_lut = np.zeros(lut_size, dtype=bool)
+            is_lower_lut[lower_codes] = True
+            is_lower_lut[upper_codes] = False
+            self._arrays = index_lut, is_lower_lut, upper_codes, lower_codes
+        return self._arrays
+
+    def codes(self, text):
+        """Массив кодов символов текста (uint32)"""
+        return np.frombuffer(text.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+
+    def encode(self, text):
+        """Индексный массив текста (uint8): индексы букв, NON_LETTER - для остальных"""
+        index_lut = self.arrays()[0]
+        return index_lut[np.minimum(self.codes(text), len(index_lut) - 1)]
+
+    def decode(self, codes, letters, new_index):
+        """
+        Замена букв текста по новым индексам
+
+        Параметры:
+            codes (np.ndarray): Коды символов исходного текста
+            letters (np.ndarray): Позиции букв в тексте
+            new_index (np.ndarray): Новые индексы этих букв
+
+        Возвращает:
+            str: текст, где буквы заменены с сохранением регистра
+        """
+        _, is_lower_lut, upper_codes, lower_codes = self.arrays()
+        lookup = np.minimum(codes[letters], len(is_lower_lut) - 1)
+        result = codes.copy()
+        result[letters] = np.where(
+            is_lower_lut[lookup], lower_codes[new_index], upper_codes[new_index]
+        )
+        return result.tobytes().decode("utf-32-le", "surrogatepass")
+
+    def shift(self, text, shifts, sign=1, offset=0, indices=None):
+        """
+        Сдвиг букв текста по периодическому ключу за одно действие
+
+        Буква на позиции i сдвигается на sign * shifts[(offset + i) % len(shifts)]
+        (sign=1 - шифрование, sign=-1 - дешифрование); регистр букв
+        и не-буквенные символы сохраняются
+
+        Параметры:
+            text (str): Исходный текст
+            shifts: Сдвиги (индексы букв ключа)
+            indices (np.ndarray): Готовый индексный массив text (если уже построен)
+        """
+        if np is None:
+            return self._shift_chars(text, shifts, sign, offset)
+
+        codes = self.codes(text)
+        if indices is None:
+            index_lut = self.arrays()[0]
+            indices = index_lut[np.minimum(codes, len(index_lut) - 1)]
+        letters = np.flatnonzero(indices != NON_LETTER)
+
+        shifts = np.asarray(shifts, dtype=np.int64)
+        new_index = (indices[letters] + sign * shifts[(offset + letters) % len(shifts)]) % self.size
+        return self.decode(codes, letters, new_index)
+
+    def _shift_chars(self, text, shifts, sign=1, offset=0):
+        """Посимвольная версия shift (без NumPy)"""
+        positions = self.positions
+        period = len(shifts)
+        result = []
+        for i, ch in enumerate(text):
+            position = positions.get(ch)
+            if position is None:
+                result.append(ch)
+                continue
+            index, is_lower = position
+            letters = self.lower if is_lower else self.upper
+            result.append(letters[(index + sign * shifts[(offset + i) % period]) % self.size])
+        return "".join(result)
+
+
+@lru_cache(maxsize=32)
+def get_alphabet(letters):
+    """Кодек для алфавита (кэшируется: таблицы строятся один раз на алфавит)"""
+    return Alphabet(letters)
+
+
+def translation_table(alphabets, shift):
+    """Общая таблица str.translate для нескольких алфавитов (каждый со своим модулем)"""
+    codes = [ord(ch) for alphabet in alphabets for ch in alphabet.positions]
+    table = [chr(code) for code in range(max(codes) + 1)]
+    for alphabet in alphabets:
+        alphabet.fill_translation(table, shift)
+    return table
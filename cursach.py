@@ -8,8 +8,10 @@
 import random
 import math
 import time
-import matplotlib.pyplot as plt
-from sympy import isprime, primerange, gcd, mod_inverse
+from sympy import isprime, primerange, gcd
+
+from elgamal_math import get_public_key, invert, powmod
+from reporting import REPORT_FORMATS, finish_figure, get_pyplot
 
 # =============================================
 # 1. Реализация шифра Эль-Гамаля
@@ -83,9 +85,9 @@ def encrypt(p, g, h, m):
     # Выбор случайного сессионного ключа
     k = random.randint(1, p-2)
     
-    # Вычисление компонентов шифротекста
-    c1 = pow(g, k, p)
-    c2 = (m * pow(h, k, p)) % p
+    # Вычисление компонентов шифротекста (таблицы ключа - см. elgamal_math)
+    c1, s = get_public_key((p, g, h)).powers(k)
+    c2 = (m * s) % p
     
     return (c1, c2)
 
@@ -102,12 +104,10 @@ def decrypt(p, x, c1, c2):
         m - расшифрованное сообщение
     """
     # Вычисление общего секрета
-    s = pow(c1, x, p)
+    s = powmod(c1, x, p)
     
-    # Нахождение обратного элемента для s
-    s_inv = mod_inverse(s, p)
-    if s_inv is None:
-        raise ValueError("Ошибка при вычислении обратного элемента")
+    # Нахождение обратного элемента для s (ValueError, если его нет)
+    s_inv = invert(s, p)
     
     # Расшифрование сообщения
     m = (c2 * s_inv) % p
@@ -186,7 +186,7 @@ def baby_step_giant_step(g, h, p):
         curr = (curr * g) % p
     
     # Giant-step: вычисление g^(-n) mod p
-    gn = pow(g, n * (p-2), p)  # По малой теореме Ферма
+    gn = invert(powmod(g, n, p), p)
     
     # Поиск совпадений
     curr = h
@@ -235,7 +235,7 @@ def pollards_rho(g, h, p):
                 return None
             if gcd(denominator, p-1) != 1:
                 return None
-            x_sol = ((a - A) * mod_inverse(denominator, p-1)) % (p-1)
+            x_sol = ((a - A) * invert(denominator, p-1)) % (p-1)
             return x_sol
     
     return None
@@ -244,12 +244,16 @@ def pollards_rho(g, h, p):
 # 4. Сравнение производительности методов
 # =============================================
 
-def benchmark_methods(max_bits=12):
+def benchmark_methods(max_bits=12, output='benchmark_results', formats=REPORT_FORMATS,
+                      show=None):
     """
     Сравнение времени работы методов криптоанализа
     
     Параметры:
         max_bits - максимальная битовая длина для теста
+        output - путь к графику без расширения (None - не сохранять)
+        formats - форматы графика и данных ('png', 'svg', 'json')
+        show - показать окно графика (по умолчанию - только при наличии дисплея)
     
     Возвращает:
         Список времен выполнения для каждого метода
@@ -287,7 +291,8 @@ def benchmark_methods(max_bits=12):
         print(f"Pollard's Rho: {t_rho:.4f} сек, x = {x_rho}")
     
     # Построение графика
-    plt.figure(figsize=(10, 6))
+    plt = get_pyplot()
+    figure = plt.figure(figsize=(10, 6))
     for method in results:
         if method == 'Brute-force':
             # Пропускаем отсутствующие значения для больших длин
@@ -303,8 +308,12 @@ def benchmark_methods(max_bits=12):
     plt.title('Сравнение методов решения DLP')
     plt.legend()
     plt.grid(True)
-    plt.savefig('benchmark_results.png')
-    plt.show()
+    # NaN (пропущенный перебор) в JSON записывается как null
+    finish_figure(figure, output, formats, show=show, data={
+        'bits': list(bit_lengths),
+        'results': {method: [None if math.isnan(t) else t for t in times]
+                    for method, times in results.items()},
+    })
     
     return results
 
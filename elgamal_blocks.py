@@ -0,0 +1,132 @@
+"""
+Блочное шифрование ElGamal (общий модуль для ElGamal.py и curs.py)
+
+Вместо отдельной пары (a, b) на каждый символ текст переводится в байты UTF-8,
+к ним спереди приписывается длина (4 байта), и поток режется на блоки
+по block_size(p) байт - так, чтобы число блока было меньше (p - 1) / 2.
+Последний блок дополняется нулями, которые при расшифровке отбрасываются
+по длине. Число блока переводится в квадратичный вычет
+(elgamal_math.encode_message), и каждый блок шифруется своим случайным k.
+
+Шифротекст хранится в компактном двоичном формате:
+    MAGIC (4 байта) | размер элемента группы n (2 байта) | число блоков (4 байта)
+    | пары a, b по n байт каждое (big-endian)
+"""
+
+import struct
+
+from elgamal_math import decode_message, decrypt_values, encode_message, get_public_key, secret_random
+
+# Сигнатура двоичного формата шифротекста
+MAGIC = b"EGB1"
+
+# Заголовок: сигнатура, размер элемента группы в байтах, число блоков
+_HEADER = struct.Struct(">4sHI")
+
+# Размер поля длины открытого текста в начале потока
+_LENGTH = struct.Struct(">I")
+
+
+def block_size(p):
+    """Байт открытого текста в блоке: число из block_size байт всегда меньше (p - 1) / 2"""
+    size = (p.bit_length() - 2) // 8
+    if size < 1:
+        raise ValueError("Модуль p слишком мал для блочного шифрования (нужно от 10 бит)")
+    return size
+
+
+def element_size(p):
+    """Байт на элемент группы (a или b) в двоичном формате"""
+    return (p.bit_length() + 7) // 8
+
+
+def pack_blocks(data, p):
+    """Байты -> числа блоков (с длиной в начале и нулевым дополнением)"""
+    size = block_size(p)
+    stream = _LENGTH.pack(len(data)) + data
+    stream += bytes(-len(stream) % size)
+    return [int.from_bytes(stream[i:i + size], "big") for i in range(0, len(stream), size)]
+
+
+def unpack_blocks(blocks, p):
+    """Числа блоков -> исходные байты (дополнение отбрасывается по длине)"""
+    size = block_size(p)
+    try:
+        stream = b"".join(block.to_bytes(size, "big") for block in blocks)
+    except OverflowError:
+        # Число блока не помещается в block_size байт - расшифровка неверна
+        raise ValueError("Неверный закрытый ключ или поврежденный шифротекст") from None
+    if len(stream) < _LENGTH.size:
+        raise ValueError("Поврежденный шифротекст: нет поля длины")
+    (length,) = _LENGTH.unpack_from(stream)
+    if length > len(stream) - _LENGTH.size:
+        raise ValueError("Поврежденный шифротекст: длина больше данных")
+    return stream[_LENGTH.size:_LENGTH.size + length]
+
+
+def encrypt_bytes(data, public_key):
+    """
+    Шифрование байтов: список пар (a, b), свой случайный k на каждый блок
+
+    g^k и y^k для многих блоков считаются по таблицам открытого ключа
+    (elgamal_math.ElGamalPublicKey), общим для всех вызовов с этим ключом
+    """
+    key = get_public_key(public_key)
+    p = key.p
+    blocks = pack_blocks(data, p)
+    pairs = []
+    for i, m in enumerate(blocks):
+        k = secret_random.randint(2, p - 2)
+        # Все ожидаемые возведения учитываются на первом блоке
+        a, s = key.powers(k, uses=len(blocks) if i == 0 else 0)
+        pairs.append((a, encode_message(m, p) * s % p))
+    return pairs
+
+
+def decrypt_bytes(pairs, private_key, p):
+    """
+    Расшифровка пар (a, b) в байты
+
+    Одно возведение в степень на блок, обратные секреты всех блоков -
+    одним обращением Монтгомери (см. elgamal_math.decrypt_values)
+    """
+    values = decrypt_values(pairs, private_key, p)
+    return unpack_blocks([decode_message(v, p) for v in values], p)
+
+
+def serialize(pairs, p):
+    """Пары (a, b) -> компактный двоичный шифротекст"""
+    size = element_size(p)
+    parts = [_HEADER.pack(MAGIC, size, len(pairs))]
+    for a, b in pairs:
+        parts.append(a.to_bytes(size, "big"))
+        parts.append(b.to_bytes(size, "big"))
+    return b"".join(parts)
+
+
+def deserialize(blob):
+    """Двоичный шифротекст -> список пар (a, b)"""
+    if len(blob) < _HEADER.size:
+        raise ValueError("Поврежденный шифротекст: нет заголовка")
+    magic, size, count = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат шифротекста")
+    if size == 0:
+        raise ValueError("Поврежденный шифротекст: нулевой размер элемента")
+    if len(blob) != _HEADER.size + 2 * size * count:
+        raise ValueError("Поврежденный шифротекст: неверный размер")
+    values = [
+        int.from_bytes(blob[offset:offset + size], "big")
+        for offset in range(_HEADER.size, len(blob), size)
+    ]
+    return list(zip(values[0::2], values[1::2]))
+
+
+def encrypt_text(message, public_key):
+    """Шифрование строки в двоичный шифротекст"""
+    return serialize(encrypt_bytes(message.encode("utf-8"), public_key), public_key[0])
+
+
+def decrypt_text(blob, private_key, p):
+    """Расшифровка двоичного шифротекста в строку"""
+    return decrypt_bytes(deserialize(blob), private_key, p).decode("utf-8")
@@ -0,0 +1,133 @@
+"""
+Генерация ключей, посимвольное шифрование и задача эксперимента ElGamal
+(общий модуль для ElGamal.py и curs.py)
+
+Случайность эксперимента разделена на две части:
+    - поиск группы (p, g) - открытые параметры, от которых зависят время
+      генерации и число попыток. Задача ищет их генератором
+      random.Random(job_seed(seed, бит, повтор)): замеры воспроизводимы
+      и не зависят от числа процессов и порядка задач;
+    - закрытый ключ x и сессионный k - всегда из энтропии ОС
+      (elgamal_math.secret_random), поэтому по seed и параметрам
+      эксперимента их не восстановить, а процессы пула не повторяют k.
+Глобальный генератор random задачами не переинициализируется
+"""
+
+import random
+from time import perf_counter
+
+from sympy import primitive_root
+
+from elgamal_blocks import decrypt_text, encrypt_text
+from elgamal_math import decode_message, decrypt_values, encode_message, get_public_key, secret_random
+from parallel_jobs import job_seed
+from primes import DEFAULT_GROUP_METHOD, GROUP_METHODS, PRIME_METHODS, generate_group, random_prime
+
+# Все способы генерации ключей: поиск простого + primitive_root (random, sieve)
+# и группы с известным порядком генератора (safe, schnorr), см. primes.py
+KEYGEN_METHODS = PRIME_METHODS + GROUP_METHODS
+
+
+# --- Быстрая генерация ключей ---
+# method: "safe" - безопасное простое p = 2q + 1, "schnorr" - группа Шнорра
+# (генератор проверяется двумя возведениями в степень, без разложения p - 1);
+# "sieve" - инкрементальный поиск простого с решетом по малым простым,
+# "random" - прежний перебор случайных нечётных чисел; оба - с primitive_root
+# (см. primes.py); по умолчанию - безопасное простое (DEFAULT_GROUP_METHOD);
+# attempts - число полных проверок простоты;
+# rng - генератор для поиска группы (по умолчанию модуль random);
+# закрытый ключ x берется из энтропии ОС независимо от rng;
+# pool - пул готовых ключей (keypool.KeyPool): ключ берется из него за O(1),
+# если пул генерирует ключи тем же способом
+def generate_keys(bits=256, method=DEFAULT_GROUP_METHOD, rng=random, pool=None):
+    if pool is not None and pool.method == method:
+        return pool.get(bits)
+
+    if method in GROUP_METHODS:
+        p, order, g, attempts = generate_group(bits, method, rng)
+        x = secret_random.randint(2, order - 1)
+        y = pow(g, x, p)
+        return (p, g, y), x, attempts
+
+    attempts = 0
+    while True:
+        candidate, tests = random_prime(bits, method, rng)
+        attempts += tests
+        try:
+            g = primitive_root(candidate)
+            p = candidate
+            break
+        except ValueError:
+            continue
+    x = secret_random.randint(2, p - 2)
+    y = pow(g, x, p)
+    return (p, g, y), x, attempts
+
+
+# --- Шифрование ---
+# g^k и y^k - по таблицам открытого ключа, общим для всех сообщений одному
+# получателю: они строятся, когда ключ становится «горячим» (elgamal_math.py);
+# код символа переводится в квадратичный вычет (encode_message) - один раз
+# на каждый различный символ
+def encrypt(message, public_key):
+    key = get_public_key(public_key)
+    p = key.p
+    k = secret_random.randint(2, p - 2)
+    a, s = key.powers(k)
+    codes = {char: encode_message(ord(char), p) for char in set(message)}
+    return [(a, (codes[char] * s) % p) for char in message]
+
+
+# --- Расшифровка ---
+# Пары группируются по a: секрет s = a^x и s^-1 считаются один раз на каждое
+# различное a (у всего сообщения из encrypt оно одно), см. elgamal_math.py
+def decrypt(cipher, private_key, p):
+    return ''.join(chr(decode_message(m, p)) for m in decrypt_values(cipher, private_key, p))
+
+
+# --- Ключ из пула ---
+# Для run_job: ((p, g, y), x, попыток, время получения ключа из pool)
+def pool_key(bits, method, pool):
+    start = perf_counter()
+    key = generate_keys(bits, method, pool=pool)
+    return key + (perf_counter() - start,)
+
+
+# --- Задача эксперимента ---
+# Генерация ключей, шифрование и расшифровка для (bits, repeat); выполняется
+# в процессе пула (parallel_jobs.run_jobs). key - готовый ключ
+# ((p, g, y), x, попыток, время получения), взятый вызывающим процессом
+# из пула ключей: тогда задача ключ не генерирует
+def run_job(bits, repeat, plaintext, method=DEFAULT_GROUP_METHOD, block=True, seed=0, key=None):
+    start_job = perf_counter()
+
+    if key is None:
+        rng = random.Random(job_seed(seed, bits, repeat))
+        start_key = perf_counter()
+        public_key, private_key, attempts = generate_keys(bits, method, rng)
+        key_time = perf_counter() - start_key
+    else:
+        public_key, private_key, attempts, key_time = key
+
+    start_encrypt = perf_counter()
+    # Блочный режим: байты UTF-8 блоками под размер p, двоичный шифротекст;
+    # посимвольный - прежняя пара (a, b) на каждый символ
+    if block:
+        cipher = encrypt_text(plaintext, public_key)
+    else:
+        cipher = encrypt(plaintext, public_key)
+    encrypt_time = perf_counter() - start_encrypt
+
+    start_decrypt = perf_counter()
+    if block:
+        decrypted = decrypt_text(cipher, private_key, public_key[0])
+    else:
+        decrypted = decrypt(cipher, private_key, public_key[0])
+    decrypt_time = perf_counter() - start_decrypt
+
+    return {
+        "public_key": public_key, "private_key": private_key, "attempts": attempts,
+        "cipher": cipher, "decrypted": decrypted,
+        "key_time": key_time, "encrypt_time": encrypt_time, "decrypt_time": decrypt_time,
+        "job_time": perf_counter() - start_job,
+    }
@@ -0,0 +1,320 @@
+"""
+Модульная арифметика ElGamal (ElGamal.py, curs.py, cursach.py, elgamal_blocks.py)
+
+    - powmod / invert - возведение в степень и обращение по модулю; при наличии
+      gmpy2 выполняются им, иначе - встроенным pow;
+    - batch_inverse - обратные сразу для многих чисел (трюк Монтгомери: одно
+      обращение по модулю и 3(n - 1) умножений вместо n обращений);
+    - FixedBaseTable - возведение фиксированного основания (g или y открытого
+      ключа) в степень по заранее вычисленной оконной таблице: вместо ~bits
+      возведений в квадрат - bits / window умножений;
+    - ElGamalPublicKey - открытый ключ (p, g, y) с таблицами для g и y,
+      которые строятся, когда ключ становится «горячим»; get_public_key
+      хранит ключи вместе с таблицами в LRU по (p, g, y) - единственном кэше
+      таблиц, через который шифруют все модули;
+    - decrypt_values - расшифровка пар (a, b): m = b * s^-1 mod p, где
+      s = a^x mod p - общий секрет. Все пары одного сообщения, зашифрованного
+      с одним k, имеют одинаковое a, поэтому секрет и его обратный считаются
+      один раз на каждое различное a. Кэш обратных секретов (SecretCache)
+      живет в пределах одного вызова, а для повторных расшифровок одним ключом
+      вызывающий код может держать свой SecretCache и передавать его явно;
+    - encode_message / decode_message - перевод числа сообщения в квадратичный
+      вычет по модулю p и обратно: для безопасного простого p = 2q + 1 вычеты -
+      подгруппа порядка q, и b = m * s не раскрывает m через подгруппу порядка 2;
+    - secret_random - генератор секретов (закрытый ключ x, сессионный k)
+"""
+
+import random
+import threading
+from collections import OrderedDict, namedtuple
+
+try:
+    import gmpy2
+except ImportError:  # Без gmpy2 - встроенная арифметика Python
+    gmpy2 = None
+
+# Генератор секретов x и k: энтропия ОС, seed не задается, поэтому процессы
+# пула, унаследовавшие состояние random, не повторяют k друг за другом
+secret_random = random.SystemRandom()
+
+# Сколько различных a хранит кэш обратных секретов одного ключа
+SECRET_CACHE_SIZE = 4096
+
+# Ширина окна (в битах) таблиц фиксированного основания: таблица из
+# 2^window * bits / window чисел строится за время ~4 обычных возведений
+FIXED_BASE_WINDOW = 4
+
+# Таблица фиксированного основания строится только для модулей от этой
+# длины и только если ожидается не меньше FIXED_BASE_MIN_USES возведений
+FIXED_BASE_MIN_BITS = 128
+FIXED_BASE_MIN_USES = 8
+
+# Сколько открытых ключей (вместе с их таблицами) хранится одновременно
+PUBLIC_KEY_CACHE_SIZE = 16
+
+
+def powmod(base, exponent, modulus):
+    """base^exponent mod modulus (gmpy2 при наличии)"""
+    if gmpy2 is not None:
+        return int(gmpy2.powmod(base, exponent, modulus))
+    return pow(base, exponent, modulus)
+
+
+def invert(value, modulus):
+    """Обратный к value по модулю modulus; ValueError, если его нет"""
+    if gmpy2 is not None:
+        try:
+            return int(gmpy2.invert(value, modulus))
+        except ZeroDivisionError:
+            raise ValueError("Обратного элемента не существует") from None
+    return pow(value, -1, modulus)
+
+
+def encode_message(m, p):
+    """
+    Число сообщения 0 <= m < (p - 1) / 2 -> квадратичный вычет по модулю p
+
+    Берется v = m + 1 или p - v: при p = 3 mod 4 (все безопасные простые
+    больше 7) -1 - невычет, и ровно одно из них - вычет. Одно возведение
+    в степень (символ Лежандра); ValueError, если m не помещается
+    """
+    v = m + 1
+    half = (p - 1) // 2
+    if not 0 < v <= half:
+        raise ValueError(f"Число сообщения должно быть от 0 до {half - 1}, получено {m}")
+    return v if powmod(v, half, p) == 1 else p - v
+
+
+def decode_message(v, p):
+    """Обратный к encode_message перевод: вычет -> число сообщения"""
+    return (v if v <= (p - 1) // 2 else p - v) - 1
+
+
+def batch_inverse(values, p):
+    """
+    Обратные по модулю p для всех values одним обращением (трюк Монтгомери)
+
+    prefix[i] - произведение values[0..i]; обращается только полное
+    произведение, а обратные отдельных элементов восстанавливаются
+    проходом с конца
+    """
+    if not values:
+        return []
+    prefix = []
+    product = 1
+    for value in values:
+        product = product * value % p
+        prefix.append(product)
+
+    inverse = invert(product, p)
+    result = [0] * len(values)
+    for i in range(len(values) - 1, 0, -1):
+        result[i] = inverse * prefix[i - 1] % p
+        inverse = inverse * values[i] % p
+    result[0] = inverse
+    return result
+
+
+class FixedBaseTable:
+    """
+    Оконная таблица степеней фиксированного основания по модулю
+
+    rows[i][d] = base^(d * 2^(window * i)) mod modulus, поэтому
+    base^e - произведение rows[i][d_i] по цифрам e в системе счисления
+    с основанием 2^window: bits / window умножений без возведений в квадрат.
+
+    Отрицательные показатели и показатели длиннее таблицы приводятся
+    по модулю order - порядка основания или любого его кратного. По умолчанию
+    order = modulus - 1, что верно только для простого modulus (малая теорема
+    Ферма); для составного модуля order нужно передать явно
+    """
+
+    def __init__(self, base, modulus, bits=None, window=FIXED_BASE_WINDOW, order=None):
+        self.base = base
+        self.modulus = modulus
+        self.order = order or modulus - 1
+        self.window = window
+        self.bits = bits or modulus.bit_length()
+        wrap = gmpy2.mpz if gmpy2 is not None else int
+
+        self.rows = []
+        power = wrap(base % modulus)
+        for _ in range(0, self.bits, window):
+            row = [wrap(1)] * (1 << window)
+            current = wrap(1)
+            for digit in range(1, 1 << window):
+                current = current * power % modulus
+                row[digit] = current
+            self.rows.append(row)
+            power = current * power % modulus  # base^(2^(window * (i + 1)))
+
+    def pow(self, exponent):
+        """base^exponent mod modulus"""
+        if exponent < 0 or exponent.bit_length() > self.bits:
+            exponent %= self.order
+        mask = (1 << self.window) - 1
+        modulus = self.modulus
+        result = 1
+        for row in self.rows:
+            if not exponent:
+                break
+            digit = exponent & mask
+            if digit:
+                result = result * row[digit] % modulus
+            exponent >>= self.window
+        return int(result)
+
+    def memory(self):
+        """Примерный объем таблицы в байтах"""
+        entry = (self.modulus.bit_length() + 7) // 8 + 28  # число + заголовок объекта
+        return len(self.rows) * (1 << self.window) * entry
+
+
+class ElGamalPublicKey(namedtuple("ElGamalPublicKey", "p g y")):
+    """
+    Открытый ключ (p, g, y) с таблицами фиксированного основания для g и y
+
+    Ведет себя как кортеж (p, g, y). Таблицы строятся при первом
+    использовании, которое их окупает: когда суммарное число возведений
+    по ключу достигает FIXED_BASE_MIN_USES (модуль - от FIXED_BASE_MIN_BITS
+    бит). До этого g^k и y^k считаются обычным возведением в степень.
+    Счетчик и таблицы меняются под _lock - ключом можно шифровать из потоков
+    """
+
+    def __new__(cls, p, g, y):
+        key = super().__new__(cls, p, g, y)
+        key.uses = 0
+        key.tables = None
+        return key
+
+    def powers(self, k, uses=1):
+        """
+        Пара (g^k mod p, y^k mod p)
+
+        uses - сколько таких пар вызывающий код ожидает посчитать подряд
+        (например, число блоков сообщения)
+        """
+        with _lock:
+            self.uses += uses
+            tables = self.tables
+            build = tables is None and self.uses >= FIXED_BASE_MIN_USES \
+                and self.p.bit_length() >= FIXED_BASE_MIN_BITS
+        if build:
+            # Таблицы строятся без блокировки; если другой поток успел
+            # раньше, используются его таблицы
+            tables = FixedBaseTable(self.g, self.p), FixedBaseTable(self.y, self.p)
+            with _lock:
+                if self.tables is None:
+                    self.tables = tables
+                tables = self.tables
+        if tables is None:
+            return powmod(self.g, k, self.p), powmod(self.y, k, self.p)
+        g_table, y_table = tables
+        return g_table.pow(k), y_table.pow(k)
+
+    def memory(self):
+        """Объем таблиц ключа в байтах (0 - таблицы еще не построены)"""
+        tables = self.tables
+        if tables is None:
+            return 0
+        return sum(table.memory() for table in tables)
+
+
+_public_keys = OrderedDict()
+
+# Блокировка кэша ключей и счетчиков ElGamalPublicKey (пул ключей keypool.py
+# и вызывающий код могут работать в разных потоках)
+_lock = threading.Lock()
+
+
+def get_public_key(public_key):
+    """
+    Открытый ключ из кэша (LRU на PUBLIC_KEY_CACHE_SIZE ключей по (p, g, y))
+
+    public_key - кортеж (p, g, y) или ElGamalPublicKey; таблицы ключа
+    общие для всех шифрований этому получателю
+    """
+    key = tuple(public_key)
+    with _lock:
+        cached = _public_keys.get(key)
+        if cached is not None:
+            _public_keys.move_to_end(key)
+            return cached
+
+        cached = public_key if isinstance(public_key, ElGamalPublicKey) else ElGamalPublicKey(*key)
+        _public_keys[key] = cached
+        while len(_public_keys) > PUBLIC_KEY_CACHE_SIZE:
+            _public_keys.popitem(last=False)
+        return cached
+
+
+def tables_memory():
+    """
+    Память таблиц фиксированного основания в байтах
+
+    Возвращает:
+        dict: {"bytes": объем таблиц ключей из кэша, "keys": число ключей с таблицами}
+    """
+    with _lock:
+        keys = [key for key in _public_keys.values() if key.tables is not None]
+    return {"bytes": sum(key.memory() for key in keys), "keys": len(keys)}
+
+
+class SecretCache:
+    """
+    Ограниченный кэш a -> s^-1 mod p (s = a^x) для одного закрытого ключа
+
+    При переполнении вытесняются давно не использованные значения a (LRU).
+    Кэш принадлежит вызывающему коду: закрытый ключ хранится, пока жив объект
+    """
+
+    def __init__(self, private_key, p, maxsize=SECRET_CACHE_SIZE):
+        self.private_key = private_key
+        self.p = p
+        self.maxsize = maxsize
+        self._inverses = OrderedDict()
+
+    def inverses(self, a_values):
+        """
+        Обратные секреты для последовательности a (словарь a -> s^-1)
+
+        Для каждого различного a, которого нет в кэше, выполняется одно
+        возведение в степень; обращение всех новых секретов - одно общее
+        """
+        found = {}
+        missing = []
+        for a in a_values:
+            if a in found:
+                continue
+            inverse = self._inverses.get(a)
+            if inverse is None:
+                found[a] = None
+                missing.append(a)
+            else:
+                self._inverses.move_to_end(a)
+                found[a] = inverse
+
+        secrets = [powmod(a, self.private_key, self.p) for a in missing]
+        for a, inverse in zip(missing, batch_inverse(secrets, self.p)):
+            found[a] = inverse
+            self._inverses[a] = inverse
+        while len(self._inverses) > self.maxsize:
+            self._inverses.popitem(last=False)
+        return found
+
+
+def decrypt_values(cipher, private_key, p, cache=None):
+    """
+    Расшифровка пар (a, b) в числа m = b * (a^x)^-1 mod p
+
+    Стоимость - одно возведение в степень на каждое различное a
+    (и ноль - для a, уже бывших в cache). cache - SecretCache того же
+    ключа, который вызывающий код переиспользует между расшифровками;
+    None - кэш только на время этого вызова
+    """
+    if cache is None:
+        cache = SecretCache(private_key, p)
+    elif (cache.private_key, cache.p) != (private_key, p):
+        raise ValueError("Кэш секретов построен для другого ключа")
+    inverses = cache.inverses(a for a, _ in cipher)
+    return [b * inverses[a] % p for a, b in cipher]
@@ -0,0 +1,358 @@
+"""
+Пул заранее сгенерированных ключей ElGamal (для ElGamal.py, curs.py)
+
+Генерация ключа большой длины занимает секунды, и время сильно меняется
+от ключа к ключу (см. attempts в primes.py). Пул держит для каждой длины
+ключа ограниченную очередь готовых ключей:
+    - get(bits) забирает ключ из очереди за O(1); если очередь пуста,
+      ключ генерируется сразу в вызывающем потоке;
+    - фоновый поток следит за очередями и, когда в очереди остается
+      не больше половины ключей, отправляет задачи генерации в пул
+      процессов, пока очередь (вместе с генерируемыми ключами) не заполнится.
+      Если генерация ключей какой-то длины завершилась ошибкой, ошибка
+      запоминается (errors), и эта длина больше не пополняется, пока
+      get() не сгенерирует ключ этой длины успешно;
+    - ключи сохраняются на диск в компактном двоичном формате и загружаются
+      при следующем запуске. В файле есть закрытые ключи, поэтому он создается
+      с правами 0600, а при загрузке каждый ключ проверяется (g^x = y mod p),
+      и ключи, сгенерированные другим способом (method), пропускаются:
+        MAGIC (4 байта) | число ключей (4 байта)
+        | для каждого ключа: бит (2 байта), попыток (4 байта),
+          способ генерации (8 байт ASCII, дополнен нулями),
+          p, g, y, x по (bits + 7) // 8 байт каждое (big-endian)
+
+Заполнение пула заранее:
+
+    python keypool.py --bits 1024 2048 --size 8 --file results/keys.pool
+
+Пул подключается по желанию: run_experiment(..., pool=KeyPool(...)) в ElGamal.py
+и curs.py (из командной строки - python ElGamal.py --key-pool) и
+generate_keys(..., pool=pool) в elgamal_experiment.py
+"""
+
+import argparse
+import os
+import random
+import struct
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from elgamal_experiment import KEYGEN_METHODS, generate_keys
+from parallel_jobs import default_workers
+from primes import DEFAULT_GROUP_METHOD
+
+# Файл пула по умолчанию
+KEY_POOL_FILE = "results/keys.pool"
+
+# Сколько ключей каждой длины хранится в очереди
+POOL_SIZE = 8
+
+# Сигнатура двоичного формата пула
+MAGIC = b"EGK2"
+
+# Заголовок: сигнатура, число ключей
+_HEADER = struct.Struct(">4sI")
+
+# Заголовок записи ключа: длина в битах, число попыток генерации, способ генерации
+_RECORD = struct.Struct(">HI8s")
+
+
+def generate_key(bits, method=DEFAULT_GROUP_METHOD):
+    """
+    Ключ ElGamal для пула (generate_keys из elgamal_experiment.py)
+
+    Возвращает:
+        tuple: ((p, g, y), x, число попыток)
+    """
+    return generate_keys(bits, method)
+
+
+def _generate_job(generate, bits, method):
+    """Задача процесса пула: новый seed из энтропии ОС (иначе процессы,
+    унаследовавшие состояние random, выдали бы одинаковые группы)"""
+    random.seed()
+    return generate(bits, method)
+
+
+def element_size(bits):
+    """Байт на число (p, g, y или x) ключа длиной bits бит"""
+    return (bits + 7) // 8
+
+
+def serialize_keys(keys):
+    """Список (bits, способ генерации, ключ) -> компактный двоичный формат"""
+    parts = [_HEADER.pack(MAGIC, len(keys))]
+    for bits, method, ((p, g, y), x, attempts) in keys:
+        size = element_size(bits)
+        parts.append(_RECORD.pack(bits, attempts, method.encode("ascii")))
+        parts.extend(value.to_bytes(size, "big") for value in (p, g, y, x))
+    return b"".join(parts)
+
+
+def deserialize_keys(blob):
+    """Двоичный формат -> список (bits, способ генерации, ((p, g, y), x, попыток))"""
+    if len(blob) < _HEADER.size:
+        raise ValueError("Поврежденный файл пула ключей: нет заголовка")
+    magic, count = _HEADER.unpack_from(blob)
+    if magic != MAGIC:
+        raise ValueError("Неизвестный формат файла пула ключей (файл старого формата нужно удалить)")
+    keys = []
+    offset = _HEADER.size
+    for _ in range(count):
+        if offset + _RECORD.size > len(blob):
+            raise ValueError("Поврежденный файл пула ключей: данные обрываются")
+        bits, attempts, method = _RECORD.unpack_from(blob, offset)
+        method = method.rstrip(b"\0").decode("ascii", errors="replace")
+        offset += _RECORD.size
+        size = element_size(bits)
+        if offset + 4 * size > len(blob):
+            raise ValueError("Поврежденный файл пула ключей: данные обрываются")
+        p, g, y, x = (
+            int.from_bytes(blob[offset + i * size:offset + (i + 1) * size], "big")
+            for i in range(4)
+        )
+        offset += 4 * size
+        # Закрытый ключ должен соответствовать открытому
+        if p.bit_length() != bits or not (1 < g < p and 1 < x < p - 1) or pow(g, x, p) != y:
+            raise ValueError("Поврежденный файл пула ключей: ключ не проходит проверку g^x = y mod p")
+        keys.append((bits, method, ((p, g, y), x, attempts)))
+    return keys
+
+
+class KeyPool:
+    """
+    Пул ключей ElGamal с фоновым пополнением
+
+    Параметры:
+        bits_list: Длины ключей, которые пул держит готовыми
+        size: Емкость очереди каждой длины
+        method: Способ генерации (передается в generate)
+        path: Файл для сохранения пула (None - без сохранения)
+        workers: Число процессов генерации (None - по числу ядер)
+        generate: generate(bits, method) -> ((p, g, y), x, попыток); функция
+            верхнего уровня модуля (передается в процессы по имени)
+
+    Использование:
+        with KeyPool([1024, 2048], path=KEY_POOL_FILE) as pool:
+            public_key, private_key, attempts = pool.get(1024)
+    """
+
+    def __init__(self, bits_list, size=POOL_SIZE, method=DEFAULT_GROUP_METHOD, path=None,
+                 workers=None, generate=generate_key):
+        self.size = size
+        self.method = method
+        self.path = path
+        self.workers = workers or default_workers()
+        self.generate = generate
+        self.queues = {bits: deque() for bits in bits_list}
+        self.pending = dict.fromkeys(bits_list, 0)
+        self.errors = {}
+        self.hits = self.misses = 0
+        self._condition = threading.Condition()
+        self._executor = None
+        self._thread = None
+        self._stopped = False
+        if path and os.path.exists(path):
+            self.load(path)
+
+    # ==================== Получение ключей ====================
+
+    def get(self, bits):
+        """
+        Ключ длиной bits бит: ((p, g, y), x, попыток)
+
+        Из очереди - за O(1); при пустой очереди ключ генерируется сразу.
+        Новая длина добавляется в пул (и дальше пополняется в фоне) только
+        после успешной генерации - иначе ошибка генерации выбрасывается
+        вызывающему, а очередь не создается
+        """
+        with self._condition:
+            queue = self.queues.get(bits)
+            if queue:
+                self.hits += 1
+                self._condition.notify_all()  # Фоновый поток проверит очереди
+                return queue.popleft()
+            self.misses += 1
+            if queue is not None:
+                self._condition.notify_all()
+
+        key = self.generate(bits, self.method)
+        with self._condition:
+            if bits not in self.queues:
+                self.queues[bits] = deque()
+                self.pending[bits] = 0
+            # Длина снова генерируется - фоновое пополнение возобновляется
+            self.errors.pop(bits, None)
+            self._condition.notify_all()
+        return key
+
+    def stats(self):
+        """Состояние пула: {bits: (готово, генерируется)}, попадания, промахи, ошибки"""
+        with self._condition:
+            return {
+                "queues": {bits: (len(queue), self.pending[bits]) for bits, queue in self.queues.items()},
+                "hits": self.hits,
+                "misses": self.misses,
+                "errors": dict(self.errors),
+            }
+
+    # ==================== Фоновое пополнение ====================
+
+    def start(self):
+        """Запуск фонового пополнения (пул процессов и следящий поток)"""
+        if self._thread is not None:
+            return self
+        self._stopped = False
+        self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        self._thread = threading.Thread(target=self._refill_loop, name="KeyPool", daemon=True)
+        self._thread.start()
+        return self
+
+    def _shortage(self):
+        """Сколько ключей каждой длины нужно заказать (под блокировкой);
+        длины, генерация которых завершилась ошибкой, не заказываются"""
+        needed = {}
+        for bits, queue in self.queues.items():
+            if bits in self.errors:
+                continue
+            have = len(queue) + self.pending[bits]
+            if have <= self.size // 2:
+                needed[bits] = self.size - have
+        return needed
+
+    def _refill_loop(self):
+        """Фоновый поток: заказ ключей для очередей, опустевших наполовину"""
+        with self._condition:
+            while not self._stopped:
+                needed = self._shortage()
+                if not needed:
+                    self._condition.wait()
+                    continue
+                for bits, count in needed.items():
+                    for _ in range(count):
+                        future = self._executor.submit(
+                            _generate_job, self.generate, bits, self.method
+                        )
+                        self.pending[bits] += 1
+                        future.add_done_callback(lambda f, bits=bits: self._on_generated(bits, f))
+
+    def _on_generated(self, bits, future):
+        """Ключ из процесса генерации - в очередь (лишние отбрасываются);
+        ошибка генерации запоминается в errors и останавливает пополнение этой длины"""
+        with self._condition:
+            self.pending[bits] -= 1
+            if not future.cancelled():
+                error = future.exception()
+                if error is not None:
+                    self.errors[bits] = error
+                else:
+                    queue = self.queues[bits]
+                    if len(queue) < self.size:
+                        queue.append(future.result())
+            self._condition.notify_all()
+
+    def fill(self, timeout=None):
+        """
+        Ожидание заполнения всех очередей (возвращает False по таймауту)
+
+        Если генерация ключей какой-то длины завершилась ошибкой, она
+        выбрасывается, как только все генерируемые ключи этой длины готовы
+        """
+        self.start()
+        with self._condition:
+            filled = self._condition.wait_for(
+                lambda: any(self.pending[bits] == 0 for bits in self.errors)
+                or all(len(queue) >= self.size for queue in self.queues.values()),
+                timeout,
+            )
+            for bits, error in self.errors.items():
+                if self.pending[bits] == 0:
+                    raise error
+            return filled
+
+    def stop(self, save=True):
+        """Остановка пополнения; незапущенные задачи отменяются, пул сохраняется"""
+        if self._thread is not None:
+            with self._condition:
+                self._stopped = True
+                self._condition.notify_all()
+            self._thread.join()
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._thread = self._executor = None
+        if save and self.path:
+            self.save()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    # ==================== Сохранение на диск ====================
+
+    def save(self, path=None):
+        """
+        Запись готовых ключей в файл
+
+        Через временный файл - без порчи при сбое; файл создается с правами
+        0600 (только владелец), так как в нем закрытые ключи
+        """
+        path = path or self.path
+        with self._condition:
+            keys = [(bits, self.method, key) for bits, queue in self.queues.items() for key in queue]
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = path + ".tmp"
+        if os.path.exists(temporary):  # Остаток прерванной записи - с неизвестными правами
+            os.remove(temporary)
+        descriptor = os.open(temporary, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        with os.fdopen(descriptor, "wb") as f:
+            f.write(serialize_keys(keys))
+        os.replace(temporary, path)
+        return len(keys)
+
+    def load(self, path=None):
+        """
+        Загрузка ключей из файла в очереди (не больше size на длину)
+
+        Ключи, сгенерированные не способом пула (self.method), пропускаются:
+        generate_keys берет ключ из пула, только если способы совпадают
+        """
+        with open(path or self.path, "rb") as f:
+            keys = deserialize_keys(f.read())
+        loaded = 0
+        with self._condition:
+            for bits, method, key in keys:
+                if method != self.method:
+                    continue
+                queue = self.queues.setdefault(bits, deque())
+                self.pending.setdefault(bits, 0)
+                if len(queue) < self.size:
+                    queue.append(key)
+                    loaded += 1
+            self._condition.notify_all()
+        return loaded
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Заполнение пула ключей ElGamal")
+    parser.add_argument("--bits", nargs="+", type=int, default=[256, 512, 1024],
+                        help="длины ключей в битах")
+    parser.add_argument("--size", type=int, default=POOL_SIZE, help="ключей каждой длины")
+    parser.add_argument("--method", choices=KEYGEN_METHODS, default=DEFAULT_GROUP_METHOD,
+                        help="способ генерации ключей (см. primes.py)")
+    parser.add_argument("--file", default=KEY_POOL_FILE, help="файл пула")
+    parser.add_argument("--workers", type=int, default=None, help="число процессов генерации")
+    args = parser.parse_args(argv)
+
+    with KeyPool(args.bits, args.size, args.method, args.file, args.workers) as pool:
+        pool.fill()
+        for bits, (ready, _) in pool.stats()["queues"].items():
+            print(f"{bits:>6} бит: {ready} ключей")
+    print(f"Пул сохранен в {args.file}")
+
+
+if __name__ == "__main__":
+    main()
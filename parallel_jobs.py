@@ -0,0 +1,81 @@
+"""
+Запуск независимых задач экспериментов в пуле процессов (ElGamal.py, curs.py)
+
+Поиск простых чисел при генерации ключей занимает одно ядро целиком, а повторы
+эксперимента независимы друг от друга - поэтому задачи (бит, повтор)
+распределяются по процессам. Каждая задача создает свой генератор
+random.Random(job_seed(общий seed, бит, повтор)) для воспроизводимой части
+эксперимента (см. elgamal_experiment.py): замеры не зависят ни от числа
+процессов, ни от порядка выполнения задач, а глобальный random не затрагивается
+"""
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from time import perf_counter
+
+
+def job_seed(seed, *key):
+    """Seed задачи: строка из общего seed и ключа задачи (random.Random от строки детерминирован)"""
+    return ":".join(map(str, (seed,) + key))
+
+
+def default_workers():
+    """Число процессов по умолчанию - число доступных ядер"""
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:  # Нет sched_getaffinity (Windows, macOS)
+        return os.cpu_count() or 1
+
+
+def run_jobs(function, jobs, workers=None):
+    """
+    Выполнение function(*args) для каждого кортежа args из jobs
+
+    workers=1 - последовательно в текущем процессе, иначе - в пуле
+    из workers процессов (по умолчанию - по числу ядер). function должна
+    быть функцией верхнего уровня модуля (передается в процессы по имени)
+
+    Возвращает:
+        tuple: (результаты в порядке jobs, время выполнения в секундах,
+                фактическое число процессов - не больше числа задач)
+    """
+    workers = min(workers or default_workers(), max(len(jobs), 1))
+    start = perf_counter()
+    if workers == 1:
+        results = [function(*args) for args in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(function, *zip(*jobs)))
+    return results, perf_counter() - start, workers
+
+
+def serial_time(function, jobs, elapsed, workers, job_times, baseline=False):
+    """
+    Время последовательного запуска тех же задач для report_speedup
+
+    При workers == 1 это само время эксперимента elapsed. baseline=True -
+    задачи выполняются еще раз с workers=1 и время замеряется; иначе
+    возвращается оценка - сумма job_times (времени задач внутри процессов)
+
+    Возвращает:
+        tuple: (время в секундах, True - если это оценка, а не замер)
+    """
+    if workers == 1:
+        return elapsed, False
+    if baseline:
+        return run_jobs(function, jobs, 1)[1], False
+    return sum(job_times), True
+
+
+def report_speedup(elapsed, serial, workers, estimate=False):
+    """
+    Вывод ускорения параллельного запуска
+
+    serial - время последовательного запуска; estimate=True - это оценка
+    по сумме времени задач (без последовательного прогона), что и печатается
+    """
+    speedup = serial / elapsed if elapsed > 0 else float("inf")
+    label = "оценка последовательного запуска" if estimate else "последовательно"
+    print(f"\nВремя эксперимента: {elapsed:.2f} сек, процессов: {workers}; "
+          f"{label}: {serial:.2f} сек, ускорение x{speedup:.2f}")
+    return speedup
@@ -0,0 +1,308 @@
+"""
+Генерация случайных простых чисел для ключей ElGamal (ElGamal.py, curs.py)
+
+Способы поиска простого числа:
+    - "random": каждый раз новое случайное нечетное число и полная проверка
+      простоты (прежний способ generate_keys);
+    - "sieve": инкрементальный поиск - от случайной стартовой точки
+      просматривается окно подряд идущих нечетных чисел, и сначала решетом
+      по малым простым из окна вычеркиваются все числа с малыми делителями.
+      Полная проверка (isprime) выполняется только для оставшихся кандидатов,
+      которых в несколько раз меньше.
+
+Для ElGamal больших размеров (1024-3072 бит) строятся группы, в которых
+порядок генератора известен заранее и не нужно раскладывать p - 1 на множители
+(как в sympy.primitive_root):
+    - "safe": безопасное простое p = 2q + 1 (q простое) - g порождает всю
+      группу, если g^2 != 1 и g^q != 1 (два возведения в степень);
+    - "schnorr": группа Шнорра p = kq + 1 с простым q длиной SCHNORR_Q_BITS бит -
+      g = h^k порождает подгруппу порядка q, если g != 1. Безопасные простые
+      встречаются примерно в bits раз реже обычных, поэтому для 2048-3072 бит
+      быстрее группа Шнорра: ее поиск стоит как поиск одного простого p.
+      Но секрет s = y^k лежит в подгруппе порядка q, а сообщение m - нет,
+      поэтому b = m * s раскрывает m^q и проекции m на малые подгруппы
+      (p - 1 делится на k). Группы Шнорра годятся для замеров генерации
+      ключей, но не для шифрования сообщений (см. elgamal_math.encode_message).
+
+Число попыток - это число полных проверок простоты (для безопасных простых -
+число кандидатов q, дошедших до проверки)
+"""
+
+import random
+from bisect import bisect_left
+from time import perf_counter
+
+from sympy import isprime
+
+# Граница малых простых для решета: 16 * bits, но не больше SIEVE_PRIME_LIMIT.
+# Полная проверка коротких чисел дешева, и большое решето для них не окупается
+SIEVE_PRIME_LIMIT = 1 << 14
+SIEVE_LIMIT_PER_BIT = 16
+
+# Число нечетных кандидатов в окне решета: 8 * bits - в среднем простое
+# встречается среди ~0.35 * bits подряд идущих нечетных чисел
+SIEVE_WINDOW_PER_BIT = 8
+
+# Для безопасных простых окно больше: они встречаются примерно в bits раз реже
+SAFE_WINDOW_PER_BIT = 64
+
+# Способы поиска простого числа
+PRIME_METHODS = ("random", "sieve")
+
+# Способы построения группы ElGamal с известным порядком генератора
+GROUP_METHODS = ("safe", "schnorr")
+
+# Длина простого порядка подгруппы в группах Шнорра
+SCHNORR_Q_BITS = 256
+
+# Способ генерации ключей по умолчанию: безопасное простое. Оно ищется дольше
+# группы Шнорра (~10 секунд на 1024 битах), но только в нем сообщение,
+# закодированное квадратичным вычетом, не раскрывается через подгруппы
+DEFAULT_GROUP_METHOD = "safe"
+
+
+def small_primes(limit):
+    """Нечетные простые числа меньше limit (решето Эратосфена)"""
+    sieve = bytearray([1]) * limit
+    sieve[:2] = b"\x00\x00"
+    for n in range(2, int(limit ** 0.5) + 1):
+        if sieve[n]:
+            sieve[n * n::n] = bytes(len(range(n * n, limit, n)))
+    return [n for n in range(3, limit) if sieve[n]]
+
+
+SMALL_PRIMES = small_primes(SIEVE_PRIME_LIMIT)
+
+
+def random_prime_naive(bits, rng=random):
+    """
+    Прежний способ: случайные нечетные числа до первого простого
+
+    Возвращает:
+        tuple: (простое число, число проверок простоты)
+    """
+    attempts = 0
+    while True:
+        attempts += 1
+        candidate = rng.getrandbits(bits) | 1  # нечётное число
+        if isprime(candidate):
+            return candidate, attempts
+
+
+def sieve_progression(candidates, start, step, primes):
+    """
+    Вычеркивание кандидатов start + step * i с малыми делителями (на месте)
+
+    Для каждого малого простого r находится первый номер i, при котором
+    start + step * i делится на r, и срезом вычеркивается каждый r-й кандидат
+    """
+    window = len(candidates)
+    for r in primes:
+        if r >= start:
+            break  # Само малое простое не должно вычеркивать себя
+        if step % r == 0:
+            if start % r == 0:
+                candidates[:] = bytes(window)
+            continue
+        # start + step * i ≡ 0 (mod r)  =>  i ≡ -start * step^-1 (mod r)
+        first = (-start * pow(step, -1, r)) % r
+        candidates[first::r] = bytes(len(range(first, window, r)))
+    return candidates
+
+
+def sieve_window(start, window, primes=SMALL_PRIMES):
+    """
+    Решето по малым простым для кандидатов start + 2 * i, i < window (start нечетно)
+
+    Возвращает:
+        bytearray: 1 - у кандидата нет малых делителей
+    """
+    return sieve_progression(bytearray([1]) * window, start, 2, primes)
+
+
+def _sieve_primes(bits):
+    """Малые простые для решета кандидатов длиной bits бит"""
+    limit = min(SIEVE_PRIME_LIMIT, SIEVE_LIMIT_PER_BIT * bits)
+    return SMALL_PRIMES[:bisect_left(SMALL_PRIMES, limit)]
+
+
+def random_prime_sieve(bits, rng=random):
+    """
+    Инкрементальный поиск простого числа длиной ровно bits бит
+
+    Стартовая точка - случайное нечетное число со старшим битом; окна
+    из SIEVE_WINDOW_PER_BIT * bits нечетных чисел просматриваются подряд,
+    полная проверка простоты - только для кандидатов, переживших решето
+
+    Возвращает:
+        tuple: (простое число, число проверок простоты)
+    """
+    if bits < 3:
+        raise ValueError("Длина простого числа должна быть не меньше 3 бит")
+    low, high = 1 << (bits - 1), 1 << bits
+    window = SIEVE_WINDOW_PER_BIT * bits
+    primes = _sieve_primes(bits)
+    attempts = 0
+    start = rng.getrandbits(bits) | low | 1
+
+    while True:
+        # Окно не выходит за bits бит; у верхней границы - новый случайный старт
+        size = min(window, (high - start + 1) // 2)
+        if size <= 0:
+            start = rng.getrandbits(bits) | low | 1
+            continue
+
+        candidates = sieve_window(start, size, primes)
+        for i in range(size):
+            if candidates[i]:
+                attempts += 1
+                if isprime(start + 2 * i):
+                    return start + 2 * i, attempts
+        start += 2 * size
+
+
+def random_prime(bits, method="sieve", rng=random):
+    """Случайное простое число заданным способом: (простое число, число проверок)"""
+    if method == "sieve":
+        return random_prime_sieve(bits, rng)
+    if method == "random":
+        return random_prime_naive(bits, rng)
+    raise ValueError(f"Неизвестный способ поиска простого числа: {method}")
+
+
+def random_safe_prime(bits, rng=random):
+    """
+    Безопасное простое p = 2q + 1 длиной ровно bits бит
+
+    Кандидаты q перебираются окнами подряд идущих нечетных чисел, и решето
+    вычеркивает сразу и q, и p = 2q + 1 с малыми делителями. Выжившие p сначала
+    проверяются дешевым тестом Ферма по основанию 2, и только потом q и p -
+    полной проверкой простоты
+
+    Возвращает:
+        tuple: (p, q, число кандидатов, дошедших до проверки)
+    """
+    if bits < 4:
+        raise ValueError("Длина безопасного простого должна быть не меньше 4 бит")
+    q_bits = bits - 1
+    low, high = 1 << (q_bits - 1), 1 << q_bits
+    window = SAFE_WINDOW_PER_BIT * bits
+    # Решето отсеивает сразу два числа, поэтому берутся все малые простые
+    primes = SMALL_PRIMES
+    attempts = 0
+    start = rng.getrandbits(q_bits) | low | 1
+
+    while True:
+        size = min(window, (high - start + 1) // 2)
+        if size <= 0:
+            start = rng.getrandbits(q_bits) | low | 1
+            continue
+
+        # q = start + 2i и p = 2q + 1 = (2 * start + 1) + 4i
+        candidates = sieve_window(start, size, primes)
+        sieve_progression(candidates, 2 * start + 1, 4, primes)
+        for i in range(size):
+            if candidates[i]:
+                q = start + 2 * i
+                p = 2 * q + 1
+                attempts += 1
+                if pow(2, p - 1, p) == 1 and isprime(q) and isprime(p):
+                    return p, q, attempts
+        start += 2 * size
+
+
+def safe_prime_group(bits, rng=random):
+    """
+    Группа по безопасному простому p = 2q + 1 и ее генератор
+
+    Порядок группы p - 1 = 2q, поэтому g - генератор, если g^2 != 1
+    и g^q != 1: вместо разложения p - 1 - два возведения в степень
+
+    Возвращает:
+        tuple: (p, порядок g = p - 1, g, число попыток)
+    """
+    p, q, attempts = random_safe_prime(bits, rng)
+    while True:
+        g = rng.randint(2, p - 2)
+        if pow(g, 2, p) != 1 and pow(g, q, p) != 1:
+            return p, p - 1, g, attempts
+
+
+def schnorr_group(bits, q_bits=SCHNORR_Q_BITS, rng=random):
+    """
+    Группа Шнорра: p = kq + 1 длиной bits бит с простым q длиной q_bits бит
+
+    Сначала ищется q (random_prime_sieve), затем четные k подряд, начиная
+    со случайного; кандидаты p = kq + 1 образуют арифметическую прогрессию
+    с шагом 2q и так же отсеиваются решетом. Генератор подгруппы порядка q -
+    g = h^k mod p при g != 1
+
+    Возвращает:
+        tuple: (p, порядок g = q, g, число попыток)
+    """
+    q_bits = min(q_bits, bits // 2)
+    q, attempts = random_prime_sieve(q_bits, rng)
+    low, high = 1 << (bits - 1), 1 << bits
+    k_low = -(-low // q)   # k, при которых p = kq + 1 имеет ровно bits бит
+    k_high = (high - 2) // q
+    window = SIEVE_WINDOW_PER_BIT * bits
+    primes = _sieve_primes(bits)
+
+    k = rng.randint(k_low, k_high) & ~1
+    while True:
+        size = min(window, (k_high - k) // 2 + 1)
+        if k < k_low or size <= 0:
+            k = rng.randint(k_low, k_high) & ~1
+            continue
+
+        candidates = sieve_progression(bytearray([1]) * size, k * q + 1, 2 * q, primes)
+        for i in range(size):
+            if candidates[i]:
+                attempts += 1
+                p = (k + 2 * i) * q + 1
+                if isprime(p):
+                    while True:
+                        g = pow(rng.randint(2, p - 2), k + 2 * i, p)
+                        if g != 1:
+                            return p, q, g, attempts
+        k += 2 * size
+
+
+def generate_group(bits, method=DEFAULT_GROUP_METHOD, rng=random):
+    """Группа ElGamal заданным способом из GROUP_METHODS: (p, порядок g, g, попытки)"""
+    if method == "safe":
+        return safe_prime_group(bits, rng)
+    if method == "schnorr":
+        return schnorr_group(bits, rng=rng)
+    raise ValueError(f"Неизвестный способ построения группы: {method}")
+
+
+def compare_prime_methods(bits_list, repeats=5, seed=0, generate=random_prime,
+                          methods=PRIME_METHODS):
+    """
+    Сравнение способов поиска простого числа: среднее время и число проверок
+
+    generate(bits, method, rng) - замеряемая функция, последний элемент ее
+    результата - число попыток (random_prime или generate_group).
+    Каждый способ получает свой генератор random.Random(seed): замеры
+    воспроизводимы, а глобальный random, из которого потом берутся
+    закрытые ключи, не затрагивается
+
+    Возвращает:
+        list: [(бит, способ, среднее время, среднее число попыток), ...]
+    """
+    rows = []
+    print(f"\n{'Бит':>6} {'Способ':>8} {'Время, сек':>12} {'Попыток':>10}")
+    for bits in bits_list:
+        for method in methods:
+            rng = random.Random(seed)
+            total_time = total_attempts = 0
+            for _ in range(repeats):
+                start = perf_counter()
+                attempts = generate(bits, method, rng)[-1]
+                total_time += perf_counter() - start
+                total_attempts += attempts
+            row = (bits, method, total_time / repeats, total_attempts / repeats)
+            print(f"{row[0]:>6} {row[1]:>8} {row[2]:>12.6f} {row[3]:>10.1f}")
+            rows.append(row)
+    return rows
@@ -0,0 +1,122 @@
+"""
+Вывод графиков и данных экспериментов
+
+matplotlib импортируется только тогда, когда действительно строится график
+(импорт занимает сотни миллисекунд). Если дисплея нет, выбирается
+неинтерактивный backend Agg, и вместо открытия окна график только
+сохраняется в файл - пакетные запуски и CI не зависают на plt.show().
+Вместе с картинкой (PNG/SVG) можно сохранить исходные данные графика в JSON
+"""
+
+import json
+import os
+import re
+import sys
+
+# Форматы, в которые сохраняется график по умолчанию
+DEFAULT_FORMATS = ("png",)
+
+# Поддерживаемые форматы вывода: картинки и исходные данные
+SUPPORTED_FORMATS = ("png", "svg", "json")
+
+# Форматы отчетов экспериментов: картинка и исходные данные графика
+REPORT_FORMATS = ("png", "json")
+
+# Переменная окружения, принудительно включающая режим без дисплея
+HEADLESS_ENV = "REPORT_HEADLESS"
+
+_pyplot = None
+
+
+def is_headless():
+    """
+    Нужно ли работать без окон
+
+    Режим без дисплея включается переменной REPORT_HEADLESS, а в Linux -
+    также при отсутствии DISPLAY и WAYLAND_DISPLAY (сервер, CI)
+    """
+    if os.environ.get(HEADLESS_ENV, "").lower() in ("1", "true", "yes"):
+        return True
+    if sys.platform.startswith("linux"):
+        return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+    return False
+
+
+def get_pyplot():
+    """
+    Ленивый импорт matplotlib.pyplot
+
+    Без дисплея выбирается backend Agg (если backend не задан явно через
+    MPLBACKEND). Модуль импортируется один раз и затем переиспользуется
+    """
+    global _pyplot
+    if _pyplot is None:
+        import matplotlib
+        if is_headless() and not os.environ.get("MPLBACKEND"):
+            matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        _pyplot = plt
+    return _pyplot
+
+
+def slugify(title, default="report"):
+    """
+    Имя файла из произвольного заголовка
+
+    Все, кроме букв, цифр и дефиса, заменяется на "_": в имени не остается
+    разделителей каталогов и точек, которые отрезались бы как расширение
+    """
+    slug = re.sub(r"[^\w-]+", "_", title).strip("_")
+    return slug or default
+
+
+def save_json(filename, data):
+    """Сохранение данных графика в JSON (кириллица - без экранирования)"""
+    directory = os.path.dirname(filename)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=float)
+
+
+def finish_figure(figure, output=None, formats=DEFAULT_FORMATS, data=None, show=None):
+    """
+    Сохранение, показ и закрытие построенного графика
+
+    Параметры:
+        figure: Фигура matplotlib
+        output (str): Путь к файлу без расширения (или с ним - расширение
+            отбрасывается); None - ничего не сохранять
+        formats: Форматы из SUPPORTED_FORMATS ("json" сохраняет data)
+        data (dict): Исходные данные графика для JSON
+        show (bool): Показать окно; по умолчанию - только если есть дисплей
+
+    Возвращает:
+        list: пути сохраненных файлов
+    """
+    plt = get_pyplot()
+    saved = []
+
+    if output is not None:
+        base = os.path.splitext(output)[0]
+        directory = os.path.dirname(base)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        for fmt in formats:
+            if fmt not in SUPPORTED_FORMATS:
+                raise ValueError(f"Неизвестный формат отчета: {fmt}")
+            filename = f"{base}.{fmt}"
+            if fmt == "json":
+                if data is None:
+                    continue
+                save_json(filename, data)
+            else:
+                figure.savefig(filename, format=fmt)
+            saved.append(filename)
+
+    if show is None:
+        show = not is_headless()
+    if show:
+        plt.show()
+    plt.close(figure)
+    return saved